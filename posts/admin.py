@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Post, Group
+from .search import search_posts
 
 #добавил
 from .models import Comment
@@ -17,6 +18,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        """search through the FTS5 index instead of LIKE '%...%'"""
+        if not search_term:
+            return queryset, False
+        return search_posts(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     """Group fields that are displayed in the admin panel"""
@@ -0,0 +1,140 @@
+"""Read-only JSON API mirroring index, group_posts, profile and post_view.
+
+Rows are read with .values(), so no model instances are built and no
+template is rendered. Pages use the same cursors as the HTML feeds, and
+the ETag / Last-Modified handling comes from conditional_feed, keyed by
+the same generation scopes as the HTML pages.
+"""
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.templatetags.static import static
+
+from . import counters, thumbnails
+from .conditional import author_scopes, conditional_feed, group_scopes, index_scopes
+from .instrumentation import query_budget
+from .models import Comment, Group, Post, User
+from .paginator import COMMENTS_PER_PAGE, POSTS_PER_PAGE, CursorPaginator
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'author__username', 'group__slug',
+    'image', 'image_pending', 'comments_count',
+)
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+
+PLACEHOLDER = 'image_processing.svg'
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={
+        'ensure_ascii': False, 'separators': (',', ':')})
+
+
+def serialize_posts(rows):
+    """API dicts of .values(*POST_FIELDS) rows, thumbnails resolved in bulk"""
+    urls = thumbnails.feed_thumbnail_urls(
+        [row['image'] for row in rows if row['image'] and not row['image_pending']])
+    posts = []
+    for row in rows:
+        if not row['image']:
+            thumbnail = None
+        elif row['image_pending']:
+            thumbnail = static(PLACEHOLDER)
+        else:
+            thumbnail = urls.get(row['image'])
+        posts.append({
+            'id': row['id'],
+            'author': row['author__username'],
+            'group': row['group__slug'],
+            'text': row['text'],
+            'pub_date': row['pub_date'],
+            'thumbnail': thumbnail,
+            'comments_count': row['comments_count'],
+        })
+    return posts
+
+
+def serialize_comments(rows):
+    return [{
+        'id': row['id'],
+        'author': row['author__username'],
+        'text': row['text'],
+        'created': row['created'],
+    } for row in rows]
+
+
+def page_links(request, page):
+    """absolute URLs of the neighbouring pages, None at either end"""
+    def link(name, cursor):
+        if cursor is None:
+            return None
+        params = request.GET.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[name] = cursor
+        return request.build_absolute_uri('?' + params.urlencode())
+    return {
+        'next': link('after', page.next_cursor),
+        'previous': link('before', page.previous_cursor),
+    }
+
+
+def feed_response(request, queryset, **extra):
+    paginator = CursorPaginator(queryset.values(*POST_FIELDS), POSTS_PER_PAGE)
+    page = paginator.get_page(request)
+    return json_response(dict(
+        extra,
+        results=serialize_posts(page.object_list),
+        **page_links(request, page)
+    ))
+
+
+# budgets include the session and user lookups of a signed-in client
+@query_budget(3)
+@conditional_feed(index_scopes)
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@query_budget(5)
+@conditional_feed(group_scopes)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(
+        request, Post.objects.filter(group=group),
+        group={'slug': group.slug, 'title': group.title,
+               'description': group.description})
+
+
+@query_budget(5)
+@conditional_feed(author_scopes)
+def profile(request, username):
+    author = get_object_or_404(User.objects.select_related('stats'), username=username)
+    stats = counters.stats_for(author)
+    return feed_response(
+        request, Post.objects.filter(author=author),
+        author={
+            'username': author.username,
+            'full_name': author.get_full_name(),
+            'posts_count': stats.posts_count,
+            'followers_count': stats.followers_count,
+            'following_count': stats.following_count,
+        })
+
+
+# the image of a post seen for the first time costs one sorl lookup
+@query_budget(6)
+@conditional_feed(author_scopes)
+def post_view(request, username, post_id):
+    rows = serialize_posts(list(
+        Post.objects.filter(pk=post_id, author__username=username)
+        .values(*POST_FIELDS)))
+    if not rows:
+        raise Http404
+    comments = Comment.objects.filter(post_id=post_id).values(*COMMENT_FIELDS)
+    page = CursorPaginator(comments, COMMENTS_PER_PAGE, date_field='created') \
+        .get_page(request)
+    return json_response(dict(
+        post=rows[0],
+        comments=serialize_comments(page.object_list),
+        **page_links(request, page)
+    ))
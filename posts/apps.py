@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        # connect signal receivers
+        from . import signals  # noqa
+        post_migrate.connect(ensure_search_index, sender=self)
+        from .sqlite_pragmas import apply
+        connection_created.connect(apply, dispatch_uid='posts.sqlite_pragmas')
+
+
+def ensure_search_index(sender, using='default', **kwargs):
+    # a migration that rebuilds posts_post drops the search triggers
+    from .search import ensure_index
+    ensure_index(using)
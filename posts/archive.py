@@ -0,0 +1,126 @@
+"""Streamed "download my archive" of an author's posts, the comments on
+them and their images (profile_archive view).
+
+Both formats are generators for StreamingHttpResponse: rows come from
+.values().iterator(chunk_size) and image files are copied in blocks, so
+memory use does not depend on how much the author has written. The ZIP
+is written to a non-seekable buffer that is drained after every block;
+zipfile then puts the sizes in data descriptors after each entry.
+"""
+import json
+import time
+import zipfile
+
+from django.core.exceptions import SuspiciousFileOperation
+
+from .models import Comment, Post
+
+CHUNK_SIZE = 2000
+BLOCK_SIZE = 64 * 1024
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'group__slug', 'image', 'comments_count')
+COMMENT_FIELDS = ('id', 'post_id', 'author__username', 'text', 'created')
+
+
+def _default(value):
+    return value.isoformat()
+
+
+def _line(row):
+    return (json.dumps(row, default=_default, ensure_ascii=False) + '\n').encode()
+
+
+def post_rows(user):
+    return (
+        Post.objects.filter(author=user).order_by('pk')
+        .values(*POST_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def comment_rows(user):
+    return (
+        Comment.objects.filter(post__author=user).order_by('pk')
+        .values(*COMMENT_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def image_names(user):
+    return (
+        Post.objects.filter(author=user).exclude(image='').exclude(image=None)
+        .order_by('pk').values_list('image', flat=True)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def ndjson_stream(user):
+    """one {"type": "post" | "comment", ...} object per line"""
+    for row in post_rows(user):
+        row['type'] = 'post'
+        yield _line(row)
+    for row in comment_rows(user):
+        row['type'] = 'comment'
+        yield _line(row)
+
+
+class _Buffer:
+    """the write end zipfile sees, emptied by the generator after each write"""
+
+    def __init__(self):
+        self.chunks = []
+        self.written = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.written += len(data)
+        return len(data)
+
+    def tell(self):
+        # no seek(): zipfile treats the stream as unseekable
+        return self.written
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def zip_stream(user, storage):
+    """posts.ndjson, comments.ndjson and images/<name> for every image
+    that is still in `storage`"""
+    buffer = _Buffer()
+    # the JSON is deflated, the images are stored: they are compressed already
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, rows in (('posts.ndjson', post_rows(user)),
+                           ('comments.ndjson', comment_rows(user))):
+            with archive.open(name, 'w', force_zip64=True) as entry:
+                for row in rows:
+                    entry.write(_line(row))
+                    if buffer.chunks:
+                        yield buffer.drain()
+            yield buffer.drain()
+
+        for image in image_names(user):
+            try:
+                if not storage.exists(image):
+                    continue
+            except SuspiciousFileOperation:
+                # a name pointing outside MEDIA_ROOT, never served either
+                continue
+            info = zipfile.ZipInfo(
+                'images/' + image.split('/')[-1], time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            with storage.open(image, 'rb') as source, \
+                    archive.open(info, 'w', force_zip64=True) as entry:
+                while True:
+                    block = source.read(BLOCK_SIZE)
+                    if not block:
+                        break
+                    entry.write(block)
+                    if buffer.chunks:
+                        yield buffer.drain()
+            yield buffer.drain()
+    # the central directory is written on close
+    yield buffer.drain()
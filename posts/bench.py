@@ -0,0 +1,319 @@
+"""helpers shared by the benchmark management commands"""
+import contextlib
+import io
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.urls import reverse
+
+from . import instrumentation
+from .models import Comment, Follow, Group, Post, User
+
+
+@contextlib.contextmanager
+def scratch_database(name=None):
+    """runs the block against a throw-away copy of the schema,
+    so benchmarks never touch the real db.sqlite3
+
+    SQLite copies live in memory unless `name` gives a file, which
+    benchmarks with several connections need"""
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    if name is not None:
+        test_settings['NAME'] = name
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+
+
+def seed_posts(count, authors=100, group=None, batch_size=10000, stdout=None,
+               text=None):
+    """bulk insert `count` posts spread over `authors` users,
+    text(i) gives the text of the i-th post"""
+    if text is None:
+        text = 'benchmark post %s'.__mod__
+    users = User.objects.bulk_create(
+        User(username='bench_author_%s' % i) for i in range(authors))
+    # bulk_create on sqlite does not return ids
+    users = list(User.objects.filter(
+        username__startswith='bench_author_').order_by('id'))
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        posts = [
+            Post(
+                text=text(created + i),
+                author=users[(created + i) % len(users)],
+                group=group,
+            )
+            for i in range(size)
+        ]
+        for post in posts:
+            post.render_text()
+        Post.objects.bulk_create(posts)
+        created += size
+        if stdout is not None:
+            stdout.write('\rseeded %s/%s posts' % (created, count), ending='')
+            stdout.flush()
+    if stdout is not None:
+        stdout.write('')
+    return users
+
+
+def best_of(func, repeat=5):
+    """best wall-clock time of `repeat` calls in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def seed_site(posts, authors=100, comments=50, follows=20, stdout=None):
+    """a dataset for the view benchmarks, returns (reader, author, post, group)
+
+    the reader follows `follows` authors, the newest post of the first
+    author has `comments` comments"""
+    group = Group.objects.create(
+        title='Benchmark group', slug='bench-group', description='benchmark')
+    users = seed_posts(posts, authors=authors, group=group, stdout=stdout)
+    reader = User.objects.create_user(username='bench_reader', password='bench')
+    Post.objects.create(author=reader, text='benchmark draft')
+    author = users[0]
+    for followed in users[1:follows + 1]:
+        # through the ORM: the signals fill the reader's timeline
+        Follow.objects.create(user=reader, author=followed)
+    post = Post.objects.filter(author=author).order_by('-pub_date', '-id').first()
+    Comment.objects.bulk_create(
+        Comment(post=post, author=reader, text='benchmark comment %s' % i)
+        for i in range(comments))
+    # bulk_create skips the counter signals
+    call_command('reconcile_counters', stdout=io.StringIO())
+    return reader, author, post, group
+
+
+def view_scenarios(reader, author, post, group):
+    """(name, method, url, data, anonymous) for every URL in posts/urls.py;
+    data given as a str is posted as a JSON body
+
+    the list is run in order on every round, so profile_follow and
+    profile_unfollow, and the two lists of follow_bulk, always find the
+    state they change"""
+    stranger, bulk_stranger = User.objects.exclude(
+        following__user=reader).exclude(pk=reader.pk).exclude(pk=author.pk)[:2]
+    post_kwargs = {'username': author.username, 'post_id': post.pk}
+    return [
+        ('index', 'get', reverse('index'), None, False),
+        ('index (anonymous)', 'get', reverse('index'), None, True),
+        ('group', 'get', reverse('group', args=[group.slug]), None, False),
+        ('profile', 'get', reverse('profile', args=[author.username]), None, False),
+        ('post', 'get', reverse('post', kwargs=post_kwargs), None, False),
+        ('post_comments', 'get',
+         reverse('post_comments', kwargs=post_kwargs), None, False),
+        ('follow_index', 'get', reverse('follow_index'), None, False),
+        ('search', 'get', reverse('search') + '?q=benchmark', None, False),
+        ('api_index', 'get', reverse('api_index'), None, False),
+        ('api_group', 'get', reverse('api_group', args=[group.slug]), None, False),
+        ('api_profile', 'get',
+         reverse('api_profile', args=[author.username]), None, False),
+        ('api_post', 'get', reverse('api_post', kwargs=post_kwargs), None, False),
+        ('add_comment', 'post', reverse('add_comment', kwargs=post_kwargs),
+         {'text': 'benchmark comment'}, False),
+        ('profile_follow', 'get',
+         reverse('profile_follow', args=[stranger.username]), None, False),
+        ('profile_unfollow', 'get',
+         reverse('profile_unfollow', args=[stranger.username]), None, False),
+        ('follow_bulk', 'post', reverse('follow_bulk'), json.dumps({
+            'follow': [bulk_stranger.username],
+            'unfollow': [bulk_stranger.username],
+        }), False),
+        ('new_post', 'post', reverse('new_post'),
+         {'text': 'benchmark post'}, False),
+        ('profile_archive', 'get',
+         reverse('profile_archive', args=[reader.username]), None, False),
+        ('post_edit', 'get', reverse('post_edit', kwargs={
+            'username': reader.username,
+            'post_id': Post.objects.filter(author=reader).values_list(
+                'pk', flat=True).first(),
+        }), None, False),
+    ]
+
+
+def measure(client, method, url, data=None):
+    """(status, queries, sql ms, template ms, wall ms) of one request"""
+    with instrumentation.collect() as stats:
+        started = time.perf_counter()
+        if isinstance(data, str):
+            response = client.post(url, data, content_type='application/json')
+        else:
+            response = getattr(client, method)(url, data)
+        if response.streaming:
+            # the archive is read while it streams
+            b''.join(response.streaming_content)
+        wall = (time.perf_counter() - started) * 1000
+    return response.status_code, stats.queries, stats.sql_ms, stats.template_ms, wall
+
+
+def percentile(values, fraction):
+    """nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def run_views(scenarios, reader, repeat=20, warmup=2, cold=False):
+    """{name: summary} for `scenarios`, see view_scenarios()"""
+    clients = {False: Client(), True: Client()}
+    clients[False].force_login(reader)
+    samples = {name: [] for name, *_ in scenarios}
+    for round_number in range(warmup + repeat):
+        for name, method, url, data, anonymous in scenarios:
+            if cold:
+                cache.clear()
+            sample = measure(clients[anonymous], method, url, data)
+            if round_number >= warmup:
+                samples[name].append(sample)
+
+    results = {}
+    for name, rows in samples.items():
+        statuses, queries, sql, templates, wall = zip(*rows)
+        results[name] = {
+            'status': max(statuses),
+            'queries': max(queries),
+            'sql_ms': round(percentile(sql, 0.5), 3),
+            'template_ms': round(percentile(templates, 0.5), 3),
+            'p50_ms': round(percentile(wall, 0.5), 3),
+            'p95_ms': round(percentile(wall, 0.95), 3),
+        }
+    return results
+
+
+def regressions(results, baseline, threshold=0.25, noise_ms=1.0):
+    """(view, reason) for views slower or chattier than in `baseline`;
+    timings compare the median, p95 of a short run is mostly noise"""
+    found = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            found.append((name, 'queries %s -> %s' % (
+                previous['queries'], current['queries'])))
+        limit = max(previous['p50_ms'] * (1 + threshold),
+                    previous['p50_ms'] + noise_ms)
+        if current['p50_ms'] > limit:
+            found.append((name, 'p50_ms %.2f -> %.2f' % (
+                previous['p50_ms'], current['p50_ms'])))
+    return found
+
+
+def _call(handler, request):
+    """status of `request` run through the WSGI handler, the way a
+    server would: request_started / request_finished open and close the
+    connections according to CONN_MAX_AGE"""
+    status = []
+    body = handler(request.environ, lambda line, headers, exc_info=None: status.append(line))
+    for _ in body:
+        pass
+    body.close()
+    return int(status[0].split()[0])
+
+
+def _stress_thread(handler, requests, deadline, barrier, results):
+    """one client sending requests(0), requests(1), ... until deadline[0]"""
+    latencies, errors = [], 0
+    barrier.wait()
+    try:
+        for number in range(10 ** 9):
+            if time.perf_counter() >= deadline[0]:
+                break
+            request = requests(number)
+            started = time.perf_counter()
+            # "database is locked" and friends come back as 500
+            if _call(handler, request) >= 400:
+                errors += 1
+            else:
+                latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        connection.close()
+        results.append((latencies, errors))
+
+
+def stress_views(reader, author, post, threads=8, writers=2, seconds=10):
+    """`threads` clients signed in as `reader` for `seconds`: `writers` of
+    them alternate new_post and add_comment, the rest read the feeds and
+    the post page; returns the throughput and latency of both kinds"""
+    client = Client()
+    client.force_login(reader)
+    client.get(reverse('new_post'))
+    factory = RequestFactory()
+    factory.cookies = client.cookies
+    csrf = {'HTTP_X_CSRFTOKEN': client.cookies[settings.CSRF_COOKIE_NAME].value}
+    post_kwargs = {'username': author.username, 'post_id': post.pk}
+    reads = [
+        reverse('index'), reverse('profile', args=[author.username]),
+        reverse('post', kwargs=post_kwargs), reverse('follow_index'),
+    ]
+
+    def reader_requests(number):
+        return factory.get(reads[number % len(reads)])
+
+    def writer_requests(number):
+        if number % 2:
+            return factory.post(
+                reverse('new_post'), {'text': 'stress post %s' % number}, **csrf)
+        return factory.post(
+            reverse('add_comment', kwargs=post_kwargs),
+            {'text': 'stress comment %s' % number}, **csrf)
+
+    # the clock starts once every thread is ready
+    deadline = []
+    barrier = threading.Barrier(threads + 1, action=lambda: deadline.append(
+        time.perf_counter() + seconds))
+    kinds = {'read': [], 'write': []}
+    handler = WSGIHandler()
+    workers = [
+        threading.Thread(target=_stress_thread, args=(
+            handler, writer_requests if index < writers else reader_requests,
+            deadline, barrier, kinds['write' if index < writers else 'read']))
+        for index in range(threads)
+    ]
+    # 500s and query budgets would flood the output
+    quiet = [logging.getLogger(name) for name in ('django.request', 'posts.requests')]
+    levels = [logger.level for logger in quiet]
+    for logger in quiet:
+        logger.setLevel(logging.CRITICAL)
+    try:
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        for worker in workers:
+            worker.join()
+    finally:
+        for logger, level in zip(quiet, levels):
+            logger.setLevel(level)
+
+    summary = {}
+    for kind, results in kinds.items():
+        latencies = [ms for thread_latencies, _ in results for ms in thread_latencies]
+        summary[kind] = {
+            'per_s': round(len(latencies) / seconds, 1),
+            'errors': sum(errors for _, errors in results),
+            'p50_ms': round(percentile(latencies, 0.5), 2) if latencies else None,
+            'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else None,
+        }
+    return summary
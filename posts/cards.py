@@ -0,0 +1,41 @@
+"""Per-post cache of rendered cards (includes/post_item.html).
+
+The inner layer of the feed caches: when the {% cache %} fragment of a
+feed page misses (a generation moved), the page is assembled from cards
+fetched with one get_many, and only the cards that are missing get
+rendered. A card's key carries Post.updated, which changes on every save
+of the post and with its comment count, so an outdated card is simply
+never asked for again.
+
+The author sees a "Редактировать" link on their own cards, so those are
+cached as a separate variant. Author names and group titles are not in
+the key; an admin rename shows up once the cards expire.
+"""
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+# bump when includes/post_item.html changes
+VERSION = 2
+TIMEOUT = 24 * 60 * 60
+
+
+def card_key(post, own):
+    return 'post-card:%s:%s:%s:%s' % (
+        VERSION, post.pk, post.updated.timestamp(), 'own' if own else 'all')
+
+
+def render_cards(posts, user):
+    """HTML of the cards of `posts` as seen by `user`, in order"""
+    posts = list(posts)
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    keys = [card_key(post, post.author_id == user_id) for post in posts]
+    found = cache.get_many(keys)
+    missing = {}
+    for post, key in zip(posts, keys):
+        if key not in found:
+            missing[key] = render_to_string(
+                'includes/post_item.html', {'post': post, 'user': user})
+    if missing:
+        cache.set_many(missing, TIMEOUT)
+        found.update(missing)
+    return ''.join(found[key] for key in keys)
@@ -0,0 +1,97 @@
+"""Conditional GET and full-response caching for the read views.
+
+The validators come from the generation counters in posts.generations,
+so checking If-None-Match / If-Modified-Since costs one cache round trip
+(plus a pk lookup for group and profile pages) and never renders a
+template. Anonymous responses are cached whole under the same ETag.
+Pages that do get rendered may read from a replica, see posts.replicas.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import generations, replicas
+from .models import Group, User
+
+# responses are invalidated by generation, the timeout only reclaims memory
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 6
+
+
+def index_scopes(request):
+    return ['posts']
+
+
+def group_scopes(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    if group_id is None:
+        return None
+    return ['group:%s' % group_id]
+
+
+def author_scopes(request, username, **kwargs):
+    """profile and post pages: the author's posts, comments and counters"""
+    author_id = (
+        User.objects.filter(username=username).values_list('pk', flat=True).first()
+    )
+    if author_id is None:
+        return None
+    return ['author:%s' % author_id, 'profile:%s' % author_id]
+
+
+def conditional_feed(get_scopes):
+    """ETag and Last-Modified from the generations of get_scopes(),
+    304 without rendering, whole responses cached for anonymous users"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scopes = get_scopes(request, *args, **kwargs)
+            if scopes is None:
+                # unknown group or user: the view answers with its 404
+                return view(request, *args, **kwargs)
+
+            user = request.user
+            if user.is_authenticated:
+                # follow buttons and "Редактировать" depend on the viewer
+                scopes = scopes + ['timeline:%s' % user.pk]
+            state, last_changed = generations.get_state(*scopes)
+            fingerprint = '%s|%s|%s|%s' % (
+                view.__name__, request.get_full_path(), user.pk, state)
+            etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+            last_modified = int(last_changed)
+            if time.time() < last_modified + 1:
+                # HTTP dates are whole seconds: another change may still
+                # come within this one, an If-Modified-Since of it would
+                # then get a 304 for a stale page. The ETag covers it.
+                last_modified = None
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                key = 'response:%s' % etag
+                response = None if user.is_authenticated else cache.get(key)
+                if response is None:
+                    # a replica only if it has every change shown here
+                    replicas.use_replica(last_changed)
+                    response = view(request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                    if not user.is_authenticated and not response.cookies:
+                        cache.set(key, response, RESPONSE_CACHE_TIMEOUT)
+
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # always revalidate, the 304 is cheap
+            if user.is_authenticated:
+                patch_cache_control(response, no_cache=True, private=True)
+            else:
+                patch_cache_control(response, no_cache=True, public=True)
+            return response
+        return wrapper
+    return decorator
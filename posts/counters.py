@@ -0,0 +1,81 @@
+"""Denormalized counters on UserStats and Post.
+
+Write paths only ever add or subtract with F() expressions, so concurrent
+requests cannot lose updates, and clamp the result at zero: a counter
+that has drifted low must not break a delete on the CHECK constraint of
+its PositiveIntegerField. recount() and the reconcile_counters
+command rebuild the numbers from the source tables when they drift.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Comment, Follow, Post, UserStats
+
+
+def _count_of(queryset, field):
+    """correlated COUNT(*) of `queryset` rows whose `field` is the outer pk"""
+    counted = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def real_user_counts():
+    """annotations with the true counters of every user"""
+    return {
+        'real_posts_count': _count_of(Post.objects.all(), 'author'),
+        'real_followers_count': _count_of(Follow.objects.all(), 'author'),
+        'real_following_count': _count_of(Follow.objects.all(), 'user'),
+    }
+
+
+def real_comments_count():
+    return _count_of(Comment.objects.all(), 'post')
+
+
+def recount(user_id):
+    """(re)create one user's stats row from the source tables"""
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=user_id).count(),
+            'followers_count': Follow.objects.filter(author_id=user_id).count(),
+            'following_count': Follow.objects.filter(user_id=user_id).count(),
+        },
+    )
+    return stats
+
+
+def stats_for(user):
+    """user.stats, created on the fly for users that have no row yet"""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        user.stats = recount(user.pk)
+        return user.stats
+
+
+def _added(field, delta):
+    return Greatest(F(field) + delta, 0)
+
+
+def add_to_user(user_id, **deltas):
+    add_to_users([user_id], **deltas)
+
+
+def add_to_users(user_ids, **deltas):
+    # a missing row is left alone: stats_for() counts it from scratch,
+    # which already includes this change
+    UserStats.objects.filter(user_id__in=user_ids).update(
+        **{field: _added(field, delta) for field, delta in deltas.items()})
+
+
+def add_to_post(post_id, delta):
+    # the card shows the count, so its cache key moves too
+    Post.objects.filter(pk=post_id).update(
+        comments_count=_added('comments_count', delta), updated=timezone.now())
@@ -0,0 +1,116 @@
+"""Who a user follows, kept in the cache as one sorted array of author ids.
+
+The profile button, and any per-card follow button, asks whether the
+reader follows an author. With the followee set of the reader in the
+cache that is one cache get for any number of authors instead of a
+Follow query per author. The set is loaded from Follow on a miss and
+then patched by the Follow signals once their transaction commits, so a
+rolled back follow never reaches the cache.
+
+The ids are stored as the bytes of an array('I'), four bytes per author,
+and looked up with bisect.
+
+Only the process that saved the Follow patches its cache. With a cache
+shared by the workers (posts.sqlite_cache) that is every reader; with
+the per-process LocMemCache the other workers keep their copy, so there
+it expires after LOCAL_TIMEOUT seconds instead of TIMEOUT.
+"""
+from array import array
+from bisect import bisect_left, insort
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from .models import Follow
+
+TYPECODE = 'I'
+# only bounds how long a set patched by a racing request can stay wrong
+TIMEOUT = 24 * 60 * 60
+# how long another worker may show a stale follow button
+LOCAL_TIMEOUT = 30
+
+
+def _key(user_id):
+    return 'followees:%s' % user_id
+
+
+def _timeout():
+    if isinstance(caches['default'], LocMemCache):
+        return LOCAL_TIMEOUT
+    return TIMEOUT
+
+
+def _pk(user):
+    return getattr(user, 'pk', user)
+
+
+def _load(user_id):
+    followees = array(TYPECODE, Follow.objects.filter(user_id=user_id)
+                      .order_by('author_id').values_list('author_id', flat=True))
+    cache.set(_key(user_id), followees.tobytes(), _timeout())
+    return followees
+
+
+def followees(user_id):
+    """sorted array of the ids of the authors `user_id` follows"""
+    data = cache.get(_key(user_id))
+    if data is None:
+        return _load(user_id)
+    followees = array(TYPECODE)
+    followees.frombytes(data)
+    return followees
+
+
+def _contains(followees, author_id):
+    index = bisect_left(followees, author_id)
+    return index < len(followees) and followees[index] == author_id
+
+
+def is_following(user, author):
+    """whether `user` (maybe anonymous) follows `author`, a user or a pk"""
+    if not user.is_authenticated:
+        return False
+    return _contains(followees(user.pk), _pk(author))
+
+
+def following_any(user, authors):
+    """the pks among `authors` (users or pks) that `user` follows"""
+    if not user.is_authenticated:
+        return set()
+    followed = followees(user.pk)
+    return {pk for pk in map(_pk, authors) if _contains(followed, pk)}
+
+
+def _patch(user_id, author_ids, following):
+    data = cache.get(_key(user_id))
+    if data is None:
+        # loaded from Follow, with this change, on the next read
+        return
+    followees = array(TYPECODE)
+    followees.frombytes(data)
+    changed = False
+    for author_id in author_ids:
+        present = _contains(followees, author_id)
+        if following and not present:
+            insort(followees, author_id)
+        elif not following and present:
+            followees.remove(author_id)
+        else:
+            continue
+        changed = True
+    if changed:
+        cache.set(_key(user_id), followees.tobytes(), _timeout())
+
+
+def followed(user_id, *author_ids):
+    transaction.on_commit(lambda: _patch(user_id, author_ids, True))
+
+
+def unfollowed(user_id, *author_ids):
+    transaction.on_commit(lambda: _patch(user_id, author_ids, False))
+
+
+def forget(user_ids):
+    """drop the cached sets of users whose follows changed in bulk"""
+    cache.delete_many([_key(user_id) for user_id in user_ids])
@@ -0,0 +1,133 @@
+"""Following and unfollowing many authors at once (follow_bulk view).
+
+The Follow signals update counters, timelines and caches row by row,
+which is fine for one button press but not for an imported follow list
+of hundreds of authors. Here the usernames are resolved in one query,
+follows are inserted with one bulk_create, which sends no signals, and
+removed with one QuerySet.delete() while the receivers stand aside (see
+bulk()). The derived data is then updated once for the rows that were
+really inserted or deleted.
+"""
+import contextlib
+import threading
+
+from django.db import IntegrityError, transaction
+
+from . import counters, follow_graph, generations, timeline
+from .models import Follow, User
+
+MAX_USERNAMES = 1000
+
+FOLLOWED = 'followed'
+UNFOLLOWED = 'unfollowed'
+ALREADY_FOLLOWING = 'already_following'
+NOT_FOLLOWING = 'not_following'
+NOT_FOUND = 'not_found'
+SELF = 'self'
+
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def bulk():
+    """the Follow signal receivers only note the author ids of the
+    deleted follows in the yielded list, the caller updates the rest"""
+    _local.deleted = []
+    try:
+        yield _local.deleted
+    finally:
+        del _local.deleted
+
+
+def bulk_deleted():
+    """the list of bulk() running in this thread, None outside of it"""
+    return getattr(_local, 'deleted', None)
+
+
+def _prepare(user, usernames, following):
+    """(results, {author id to change: its result}): a status per
+    distinct username"""
+    usernames = list(dict.fromkeys(usernames))
+    ids = dict(
+        User.objects.filter(username__in=usernames).values_list('username', 'id'))
+    followed = set(
+        Follow.objects.filter(user=user, author_id__in=ids.values())
+        .values_list('author_id', flat=True))
+    results, changed = [], {}
+    for username in usernames:
+        author_id = ids.get(username)
+        if author_id is None:
+            status = NOT_FOUND
+        elif author_id == user.pk:
+            status = SELF
+        elif (author_id in followed) == following:
+            status = ALREADY_FOLLOWING if following else NOT_FOLLOWING
+        else:
+            status = FOLLOWED if following else UNFOLLOWED
+        result = {'username': username, 'status': status}
+        if status in (FOLLOWED, UNFOLLOWED):
+            changed[author_id] = result
+        results.append(result)
+    return results, changed
+
+
+def _insert(user, author_ids):
+    """author ids of the follows inserted, without those made meanwhile
+    by another request, which already sent their signals"""
+    rows = [Follow(user=user, author_id=author_id) for author_id in author_ids]
+    try:
+        with transaction.atomic():
+            Follow.objects.bulk_create(rows)
+        return author_ids
+    except IntegrityError:
+        pass
+    inserted = []
+    for row in rows:
+        try:
+            with transaction.atomic():
+                Follow.objects.bulk_create([row])
+        except IntegrityError:
+            continue
+        inserted.append(row.author_id)
+    return inserted
+
+
+def _changed(user, author_ids, delta):
+    counters.add_to_user(user.pk, following_count=delta * len(author_ids))
+    counters.add_to_users(author_ids, followers_count=delta)
+    # the scopes of generations.follow_scopes for every follow
+    generations.bump(
+        'timeline:%s' % user.pk, 'profile:%s' % user.pk,
+        *('profile:%s' % author_id for author_id in author_ids))
+
+
+def follow_many(user, usernames):
+    """follow every author in `usernames`, inside the caller's transaction"""
+    results, changed = _prepare(user, usernames, True)
+    author_ids = _insert(user, list(changed)) if changed else []
+    for author_id in changed.keys() - set(author_ids):
+        changed[author_id]['status'] = ALREADY_FOLLOWING
+    if author_ids:
+        if timeline.enabled():
+            timeline.backfill(user.pk, *author_ids)
+        follow_graph.followed(user.pk, *author_ids)
+        _changed(user, author_ids, 1)
+    return results
+
+
+def unfollow_many(user, usernames):
+    """unfollow every author in `usernames`, inside the caller's transaction"""
+    results, changed = _prepare(user, usernames, False)
+    author_ids = []
+    if changed:
+        with bulk() as author_ids:
+            Follow.objects.filter(user=user, author_id__in=list(changed)).delete()
+    # unfollowed meanwhile by another request
+    for author_id in changed.keys() - set(author_ids):
+        changed[author_id]['status'] = NOT_FOLLOWING
+    if author_ids:
+        if timeline.enabled():
+            timeline.remove(user.pk, *author_ids)
+        follow_graph.unfollowed(user.pk, *author_ids)
+        _changed(user, author_ids, -1)
+    return results
@@ -0,0 +1,99 @@
+"""Generation counters for the feed caches.
+
+Each scope ("posts", "group:<id>", "author:<id>", "profile:<id>",
+"timeline:<user id>") has a counter in the cache. It is part of every
+cache key and validator built for that scope, and signals bump it
+whenever a Post, Comment or Follow changes, so stale entries are never
+read again and simply expire. Next to the counter each scope keeps the
+time of its last change, used as Last-Modified.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _key(scope):
+    return 'generation:%s' % scope
+
+
+def _changed_key(scope):
+    return 'changed:%s' % scope
+
+
+def _initial():
+    # a counter lost to eviction restarts from a value it has never had,
+    # so it cannot match fragments cached under the old counter
+    return int(time.time() * 1000)
+
+
+def get_state(*scopes):
+    """current generation of every scope and the latest time any of them
+    changed, in one cache round trip"""
+    keys = [_key(scope) for scope in scopes]
+    changed_keys = [_changed_key(scope) for scope in scopes]
+    found = cache.get_many(keys + changed_keys)
+    missing = {key: _initial() for key in keys if key not in found}
+    # a lost timestamp restarts at "now": clients refetch once, never
+    # get a 304 for a change they have not seen
+    now = time.time()
+    missing.update({key: now for key in changed_keys if key not in found})
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return (
+        [found[key] for key in keys],
+        max(found[key] for key in changed_keys),
+    )
+
+
+def get_generations(*scopes):
+    """current generation of every scope, in one cache round trip"""
+    keys = [_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _initial() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    # timestamp first: a reader in between sees a new Last-Modified with
+    # the old counter, never the new counter with an old Last-Modified
+    now = time.time()
+    cache.set_many({_changed_key(scope): now for scope in scopes}, None)
+    for scope in scopes:
+        try:
+            cache.incr(_key(scope))
+        except ValueError:
+            cache.set(_key(scope), _initial(), None)
+
+
+def post_scopes(author_id, group_id):
+    """scopes whose feeds show a post by author_id in group_id"""
+    scopes = ['posts', 'author:%s' % author_id]
+    if group_id is not None:
+        scopes.append('group:%s' % group_id)
+    return scopes
+
+
+def follow_scopes(follow):
+    """scopes whose pages show a follow: the follower's feed and follow
+    buttons, and the follower counters on both profiles"""
+    return [
+        'timeline:%s' % follow.user_id,
+        'profile:%s' % follow.user_id,
+        'profile:%s' % follow.author_id,
+    ]
+
+
+def fragment_key(request, page, *scopes):
+    """vary_on value for the {% cache %} block around a feed page"""
+    parts = [str(generation) for generation in get_generations(*scopes)]
+    parts.append(request.GET.get('after', ''))
+    parts.append(request.GET.get('before', ''))
+    # the author sees "Редактировать" on their own cards
+    user = request.user
+    if user.is_authenticated and any(post.author_id == user.pk for post in page):
+        parts.append(str(user.pk))
+    return ':'.join(parts)
@@ -0,0 +1,139 @@
+"""Post-processing of uploaded post images outside the request.
+
+new_post and post_edit only store the upload and enqueue an ImageJob; the
+process_images command then strips EXIF data, applies the EXIF orientation,
+bounds the size and re-encodes the file, and creates the feed thumbnail.
+Until that is done the post is image_pending and the cards show a
+placeholder instead of the raw upload.
+"""
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import generations, thumbnails
+from .models import ImageJob, Post
+
+logger = logging.getLogger(__name__)
+
+# longest side kept after processing, larger uploads are scaled down
+MAX_SIDE = 2048
+# decompression bomb guard, checked before the pixels are decoded
+MAX_PIXELS = 50 * 1000 * 1000
+JPEG_QUALITY = 85
+MAX_ATTEMPTS = 3
+# formats re-encoded without metadata, anything else (GIF) is kept as is
+REENCODE_FORMATS = ('JPEG', 'PNG', 'WEBP')
+
+
+class ImageRejected(Exception):
+    pass
+
+
+def enqueue(post):
+    """queue the image of a post saved with image_pending set"""
+    return ImageJob.objects.create(post=post, image=post.image.name)
+
+
+def claim(limit):
+    """ids of up to `limit` pending jobs, switched to running by this worker"""
+    claimed = []
+    candidates = (
+        ImageJob.objects.filter(status=ImageJob.PENDING)
+        .order_by('id').values_list('pk', flat=True)[:limit]
+    )
+    for job_id in list(candidates):
+        # the status filter makes the update a compare-and-swap
+        if ImageJob.objects.filter(
+                pk=job_id, status=ImageJob.PENDING).update(status=ImageJob.RUNNING):
+            claimed.append(job_id)
+    return claimed
+
+
+def requeue_stale():
+    """jobs left running by a worker that died, returns their number"""
+    return ImageJob.objects.filter(status=ImageJob.RUNNING).update(
+        status=ImageJob.PENDING)
+
+
+def normalize(source):
+    """(content, extension) of the processed image read from `source`"""
+    image = Image.open(source)
+    width, height = image.size
+    if width * height > MAX_PIXELS:
+        raise ImageRejected('%sx%s is over %s pixels' % (width, height, MAX_PIXELS))
+    image_format = image.format
+    if image_format not in REENCODE_FORMATS:
+        return None, None
+
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > MAX_SIDE:
+        image.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS)
+    options = {'optimize': True}
+    if image_format == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        options.update(quality=JPEG_QUALITY, progressive=True)
+    # no exif= / pnginfo= options: the metadata is dropped on save
+    out = io.BytesIO()
+    image.save(out, format=image_format, **options)
+    return out.getvalue(), image_format.lower().replace('jpeg', 'jpg')
+
+
+def process(post):
+    """re-encode the image of `post` in place and mark it ready"""
+    old_name = post.image.name
+    with post.image.open('rb') as source:
+        content, extension = normalize(source)
+    if content is not None:
+        base = os.path.splitext(os.path.basename(old_name))[0]
+        post.image.save('%s.%s' % (base, extension), ContentFile(content),
+                        save=False)
+    post.image_pending = False
+    # post_save bumps the feed generations and pre-generates the thumbnail
+    post.save(update_fields=['image', 'image_pending', 'updated'])
+    if post.image.name != old_name:
+        post.image.storage.delete(old_name)
+
+
+def run_job(job_id):
+    """worker: process one claimed job, returns (job id, status)"""
+    job = ImageJob.objects.get(pk=job_id)
+    job.attempts += 1
+    try:
+        with transaction.atomic():
+            # the post as it is now, an edit may have come in since the claim
+            post = Post.objects.select_for_update().get(pk=job.post_id)
+            if job.image and post.image.name != job.image:
+                # replaced or already processed, the newer job has it
+                logger.info('Image job %s skipped, %s is gone', job_id, job.image)
+            elif post.image:
+                process(post)
+            else:
+                # the image was cleared before the worker got to it
+                post.image_pending = False
+                post.save(update_fields=['image_pending', 'updated'])
+    except Exception as exc:
+        logger.exception('Image job %s failed', job_id)
+        job.error = '%s: %s' % (type(exc).__name__, exc)
+        if isinstance(exc, ImageRejected) or job.attempts >= MAX_ATTEMPTS:
+            job.status = ImageJob.FAILED
+            # show the upload as is rather than a placeholder forever
+            post = Post.objects.get(pk=job.post_id)
+            Post.objects.filter(pk=post.pk).update(
+                image_pending=False, updated=timezone.now())
+            generations.bump(
+                *generations.post_scopes(post.author_id, post.group_id))
+            if post.image:
+                thumbnails.pregenerate(post.image.name)
+        else:
+            job.status = ImageJob.PENDING
+    else:
+        job.status = ImageJob.DONE
+        job.error = ''
+    job.save(update_fields=['status', 'attempts', 'error'])
+    return job_id, job.status
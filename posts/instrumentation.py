@@ -0,0 +1,234 @@
+"""Per-request SQL, template and cache instrumentation.
+
+collect() counts what happens on the current thread while it is active:
+queries and their time through a connection execute_wrapper, template
+rendering and cache lookups through wrappers that install() puts around
+Template.render and the cache backends once per process. The wrappers
+cost one thread-local lookup when nothing is collecting.
+
+ServerTimingMiddleware collects every request, answers with a
+Server-Timing header and logs one logfmt line to "posts.requests".
+Views declare how many queries they may run with @query_budget(n);
+going over it is logged as a warning and fails assert_within_budget()
+in the tests.
+"""
+import contextlib
+import logging
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger('posts.requests')
+
+_local = threading.local()
+_installed = False
+_missing = object()
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.total_ms = None
+        self.url_name = None
+        self.budget = None
+        self._template_depth = 0
+        self._cache_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        # connection.queries rounds to whole milliseconds, SQLite is faster
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_ms += (time.perf_counter() - started) * 1000
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.queries > self.budget
+
+    def as_dict(self):
+        return {
+            'url_name': self.url_name,
+            'total_ms': self.total_ms,
+            'sql_queries': self.queries,
+            'sql_ms': round(self.sql_ms, 3),
+            'template_ms': round(self.template_ms, 3),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'query_budget': self.budget,
+        }
+
+    def server_timing(self):
+        metrics = [
+            'sql;dur=%.2f;desc="%s queries"' % (self.sql_ms, self.queries),
+            'tpl;dur=%.2f' % self.template_ms,
+            'cache;desc="%s hits, %s misses"' % (self.cache_hits, self.cache_misses),
+        ]
+        if self.total_ms is not None:
+            metrics.append('total;dur=%.2f' % self.total_ms)
+        return ', '.join(metrics)
+
+
+def _active():
+    return getattr(_local, 'stack', None)
+
+
+@contextlib.contextmanager
+def collect():
+    """RequestStats of everything the current thread does inside the block"""
+    install()
+    stats = RequestStats()
+    if _active() is None:
+        _local.stack = []
+    _local.stack.append(stats)
+    try:
+        with contextlib.ExitStack() as wrappers:
+            for connection in connections.all():
+                wrappers.enter_context(connection.execute_wrapper(stats.execute))
+            yield stats
+    finally:
+        _local.stack.remove(stats)
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(template, context):
+        stack = _active()
+        if not stack:
+            return render(template, context)
+        for stats in stack:
+            stats._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(template, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            for stats in stack:
+                stats._template_depth -= 1
+                # includes render inside their parent, count them once
+                if not stats._template_depth:
+                    stats.template_ms += elapsed
+    return wrapper
+
+
+@contextlib.contextmanager
+def _cache_call(stack):
+    for stats in stack:
+        stats._cache_depth += 1
+    try:
+        yield
+    finally:
+        for stats in stack:
+            stats._cache_depth -= 1
+
+
+def _count_cache(stack, hits, misses):
+    for stats in stack:
+        # BaseCache.get_many() loops over get(), count the outer call only
+        if not stats._cache_depth:
+            stats.cache_hits += hits
+            stats.cache_misses += misses
+
+
+def _instrument_cache(backend):
+    get, get_many = backend.get, backend.get_many
+
+    @wraps(get)
+    def counted_get(cache, key, default=None, version=None):
+        stack = _active()
+        if not stack:
+            return get(cache, key, default, version)
+        with _cache_call(stack):
+            value = get(cache, key, _missing, version)
+        _count_cache(stack, int(value is not _missing), int(value is _missing))
+        return default if value is _missing else value
+
+    @wraps(get_many)
+    def counted_get_many(cache, keys, version=None):
+        stack = _active()
+        if not stack:
+            return get_many(cache, keys, version)
+        keys = list(keys)
+        with _cache_call(stack):
+            found = get_many(cache, keys, version)
+        _count_cache(stack, len(found), len(keys) - len(found))
+        return found
+
+    backend.get = counted_get
+    backend.get_many = counted_get_many
+    backend._instrumented = True
+
+
+def install():
+    """put the wrappers around Template.render and the cache backends"""
+    global _installed
+    if _installed:
+        return
+    Template.render = _timed_render(Template.render)
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        if not backend.__dict__.get('_instrumented'):
+            _instrument_cache(backend)
+    _installed = True
+
+
+def query_budget(limit):
+    """declare the most queries one request to the view may run"""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def assert_within_budget(response):
+    """test helper: fail if the view behind a test client response
+    has no query budget or ran more queries than it allows"""
+    stats = response.wsgi_request.timing
+    if stats.budget is None:
+        raise AssertionError('%s declares no query budget' % stats.url_name)
+    if stats.over_budget:
+        raise AssertionError('%s ran %s queries, its budget is %s' % (
+            stats.url_name, stats.queries, stats.budget))
+    return stats
+
+
+class ServerTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with collect() as stats:
+            response = self.get_response(request)
+        stats.total_ms = round((time.perf_counter() - started) * 1000, 3)
+
+        match = request.resolver_match
+        if match is not None:
+            stats.url_name = match.url_name or match.view_name
+            stats.budget = getattr(match.func, 'query_budget', None)
+        request.timing = stats
+
+        response['Server-Timing'] = stats.server_timing()
+        fields = stats.as_dict()
+        line = ' '.join('%s=%s' % item for item in (
+            ('method', request.method),
+            ('path', request.path),
+            ('status', response.status_code),
+            *fields.items(),
+        ))
+        logger.info(line, extra={'timing': fields})
+        if stats.over_budget:
+            logger.warning('%s ran %s queries, its budget is %s',
+                           stats.url_name, stats.queries, stats.budget)
+        return response
@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from posts.sqlite_cache import SQLiteCache
+
+BACKENDS = ('locmem', 'filebased', 'sqlite')
+# about the size of a rendered post card
+VALUE = 'x' * 1500
+
+
+def make_backend(name, directory, max_entries):
+    params = {'OPTIONS': {'MAX_ENTRIES': max_entries}}
+    if name == 'locmem':
+        return LocMemCache('bench', params)
+    if name == 'filebased':
+        return FileBasedCache(os.path.join(directory, 'files'), params)
+    return SQLiteCache(os.path.join(directory, 'cache.sqlite3'), params)
+
+
+def ops_per_second(func, count):
+    started = time.perf_counter()
+    for i in range(count):
+        func(i)
+    return count / (time.perf_counter() - started)
+
+
+def single_process(cache, ops):
+    cache.set('counter', 0)
+    keys = ['many:%s' % i for i in range(10)]
+    return [
+        ('set', ops_per_second(lambda i: cache.set('key:%s' % i, VALUE), ops)),
+        ('get hit', ops_per_second(lambda i: cache.get('key:%s' % i), ops)),
+        ('get miss', ops_per_second(lambda i: cache.get('missing:%s' % i), ops)),
+        ('set_many(10)', ops_per_second(
+            lambda i: cache.set_many(dict.fromkeys(keys, VALUE)), ops // 10)),
+        ('get_many(10)', ops_per_second(lambda i: cache.get_many(keys), ops // 10)),
+        ('incr', ops_per_second(lambda i: cache.incr('counter'), ops)),
+    ]
+
+
+def worker(args):
+    """one "gunicorn worker": writes its own keys, then reads everyone's
+    and bumps a shared counter; returns (hits, reads, ops/s)"""
+    name, directory, max_entries, index, processes, ops = args
+    cache = make_backend(name, directory, max_entries)
+    if name == 'locmem':
+        # what a fresh worker sees: nothing written by the others
+        cache.clear()
+    for i in range(ops):
+        cache.set('worker:%s:%s' % (index, i), VALUE)
+    time.sleep(0.2)
+    hits = reads = 0
+    started = time.perf_counter()
+    for i in range(ops):
+        other = (index + 1 + i % (processes - 1)) % processes
+        hits += cache.get('worker:%s:%s' % (other, i)) is not None
+        reads += 1
+        try:
+            cache.incr('generation')
+        except ValueError:
+            cache.add('generation', 0)
+    return hits, reads, 2 * ops / (time.perf_counter() - started)
+
+
+class Command(BaseCommand):
+    help = 'Compares the SQLite cache backend with LocMemCache and FileBasedCache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=1000)
+        parser.add_argument('--processes', type=int, default=4,
+                            help='at least 2')
+        parser.add_argument('--max-entries', type=int, default=100000)
+        parser.add_argument('--backend', action='append', choices=BACKENDS,
+                            help='repeat to pick several, all by default')
+
+    def handle(self, *args, **options):
+        names = options['backend'] or BACKENDS
+        ops, processes = options['ops'], max(options['processes'], 2)
+        self.stdout.write('%-14s' % 'ops/s' + ''.join('%12s' % n for n in names))
+        with tempfile.TemporaryDirectory() as root:
+            results = {}
+            for name in names:
+                directory = os.path.join(root, name)
+                os.mkdir(directory)
+                cache = make_backend(name, directory, options['max_entries'])
+                results[name] = single_process(cache, ops)
+            for row, label in enumerate(label for label, _ in results[names[0]]):
+                self.stdout.write('%-14s' % label + ''.join(
+                    '%12.0f' % results[name][row][1] for name in names))
+
+            self.stdout.write('\n%s processes, each reading the keys of another:' % processes)
+            self.stdout.write('%-14s%12s%12s' % ('backend', 'hit rate', 'ops/s'))
+            context = multiprocessing.get_context('fork')
+            for name in names:
+                directory = os.path.join(root, name)
+                jobs = [(name, directory, options['max_entries'], index, processes, ops)
+                        for index in range(processes)]
+                with context.Pool(processes) as pool:
+                    stats = pool.map(worker, jobs)
+                hits = sum(s[0] for s in stats)
+                reads = sum(s[1] for s in stats)
+                self.stdout.write('%-14s%11.0f%%%12.0f' % (
+                    name, 100 * hits / reads, sum(s[2] for s in stats)))
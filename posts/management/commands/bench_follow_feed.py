@@ -0,0 +1,129 @@
+import random
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from posts import pull_feed, timeline
+from posts.bench import best_of, scratch_database, seed_posts
+from posts.models import Follow, Post, User
+from posts.paginator import POSTS_PER_PAGE, CursorPaginator
+
+
+class JoinFeed:
+    """the Post x Follow query follow_index ran before the timelines"""
+
+    @staticmethod
+    def paginator(user_id, per_page):
+        return CursorPaginator(
+            Post.objects.for_feed().filter(author__following__user_id=user_id),
+            per_page)
+
+    @staticmethod
+    def posts_for(posts):
+        return list(posts)
+
+
+def counts(value):
+    return [int(count) for count in value.split(',')]
+
+
+def read_pages(engine, user_id, pages):
+    paginator = engine.paginator(user_id, POSTS_PER_PAGE)
+    cursor = None
+    for _ in range(pages):
+        page = paginator.page(after=cursor)
+        engine.posts_for(page.object_list)
+        cursor = page.next_cursor
+
+
+def cold(func):
+    def run():
+        cache.clear()
+        func()
+    return run
+
+
+class Command(BaseCommand):
+    help = ('Compares the follow feed engines: the JOIN query, the fan-out '
+            'timeline and the pull-model merge of cached author heads')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--authors', type=int, default=2000)
+        parser.add_argument('--follows', type=counts, default='10,100,1000',
+                            help='comma-separated followee counts, one reader each')
+        parser.add_argument('--followers', type=counts, default='10,100,1000',
+                            help='comma-separated follower counts of the writers')
+        parser.add_argument('--pages', type=int, default=3,
+                            help='pages read one after another per sample')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--max-entries', type=int, default=100000,
+                            help='of the LocMemCache used here, the pull engine '
+                                 'needs a head per followee')
+
+    def handle(self, *args, **options):
+        repeat, pages = options['repeat'], options['pages']
+        rng = random.Random(0)
+        caches = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': options['max_entries']},
+        }}
+        with override_settings(CACHES=caches), scratch_database():
+            authors = seed_posts(
+                options['posts'], authors=options['authors'], stdout=self.stdout)
+            cache.clear()
+
+            self.stdout.write('\nreading %s pages, ms (queries)' % pages)
+            self.stdout.write('%-8s%16s%16s%16s%16s' % (
+                'follows', 'join', 'timeline', 'pull', 'pull cold'))
+            for count in options['follows']:
+                reader = User.objects.create(username='bench_reader_%s' % count)
+                # without signals: one timeline rebuild instead of a
+                # backfill per follow
+                Follow.objects.bulk_create(
+                    Follow(user=reader, author=author)
+                    for author in rng.sample(authors, min(count, len(authors))))
+                timeline.rebuild(reader.pk)
+                engines = (
+                    (JoinFeed, None), (timeline, None), (pull_feed, None),
+                    (pull_feed, cold),
+                )
+                cells = []
+                for engine, wrap in engines:
+                    func = lambda: read_pages(engine, reader.pk, pages)  # noqa: E731
+                    if wrap is not None:
+                        func = wrap(func)
+                    func()
+                    reset_queries()
+                    with CaptureQueriesContext(connection) as queries:
+                        func()
+                    timing = best_of(func, repeat)
+                    cells.append('%9.2f (%3s)' % (timing, len(queries)))
+                self.stdout.write('%-8s' % count + ''.join('%16s' % c for c in cells))
+
+            self.stdout.write('\ncreating a post, ms (queries)')
+            self.stdout.write('%-10s%16s%16s' % ('followers', 'timeline', 'pull'))
+            for count in options['followers']:
+                writer = User.objects.create(username='bench_writer_%s' % count)
+                readers = User.objects.bulk_create(
+                    User(username='bench_follower_%s_%s' % (count, i))
+                    for i in range(count))
+                readers = User.objects.filter(
+                    username__startswith='bench_follower_%s_' % count)
+                Follow.objects.bulk_create(
+                    Follow(user=follower, author=writer) for follower in readers)
+                # the pull engine patches a cached head
+                pull_feed.heads([writer.pk])
+                cells = []
+                for engine in ('timeline', 'pull'):
+                    def write():
+                        Post.objects.create(author=writer, text='benchmark post')
+                    with override_settings(FOLLOW_FEED_ENGINE=engine):
+                        reset_queries()
+                        with CaptureQueriesContext(connection) as queries:
+                            write()
+                        timing = best_of(write, repeat)
+                    cells.append('%9.2f (%3s)' % (timing, len(queries)))
+                self.stdout.write('%-10s' % count + ''.join('%16s' % c for c in cells))
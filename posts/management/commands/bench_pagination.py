@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+
+from posts.bench import best_of, scratch_database, seed_posts
+from posts.models import Post
+from posts.paginator import POSTS_PER_PAGE, CursorPaginator
+
+
+class Command(BaseCommand):
+    help = 'Compares OFFSET pagination with cursor pagination of the index feed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000000)
+        parser.add_argument('--page', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, deep_page = options['rows'], options['page']
+        if (deep_page - 1) * POSTS_PER_PAGE >= rows:
+            self.stderr.write('--page is past the end of --rows posts')
+            return
+
+        with scratch_database():
+            seed_posts(rows, stdout=self.stdout)
+            posts = Post.objects.all()
+
+            ordered = posts.order_by('-pub_date', '-id')
+            cursor_paginator = CursorPaginator(posts, POSTS_PER_PAGE)
+            # the cursor a reader holds after clicking "next" deep_page - 1 times
+            deep_cursor = cursor_paginator.cursor_for_page_number(deep_page)
+
+            def offset_page(number):
+                # a fresh Paginator every time, its COUNT(*) is part of the cost
+                return list(Paginator(ordered, POSTS_PER_PAGE).page(number))
+
+            results = (
+                ('offset', 1, lambda: offset_page(1)),
+                ('offset', deep_page, lambda: offset_page(deep_page)),
+                ('cursor', 1, lambda: list(cursor_paginator.page())),
+                ('cursor', deep_page,
+                 lambda: list(cursor_paginator.page(after=deep_cursor))),
+            )
+            self.stdout.write('%s posts, %s per page' % (rows, POSTS_PER_PAGE))
+            for name, number, fetch in results:
+                timing = best_of(fetch, options['repeat'])
+                self.stdout.write(
+                    '%-6s page %-8s %9.2f ms' % (name, number, timing))
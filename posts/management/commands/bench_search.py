@@ -0,0 +1,51 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from posts import search
+from posts.bench import best_of, scratch_database, seed_posts
+from posts.models import Post
+from posts.paginator import POSTS_PER_PAGE
+
+WORDS = (
+    'кот собака дом река лес город море солнце дождь снег утро вечер '
+    'книга музыка поезд дорога окно сад поле небо ветер гора мост друг'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Compares FTS5 search with the LIKE scan PostAdmin used to run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500000)
+        parser.add_argument('--words', type=int, default=30,
+                            help='words per post')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        # a rare word every thousand posts, the worst case for LIKE
+        def text(i):
+            words = rng.choices(WORDS, k=options['words'])
+            if i % 1000 == 0:
+                words.append('редкоеслово')
+            return ' '.join(words)
+
+        with scratch_database():
+            seed_posts(options['rows'], text=text, stdout=self.stdout)
+            posts = Post.objects.all()
+            self.stdout.write('%-12s %-6s %12s %12s' % (
+                'term', 'what', 'LIKE ms', 'FTS5 ms'))
+            for term in ('кот', 'редкоеслово', 'кот дождь'):
+                like = posts
+                for word in term.split():
+                    like = like.filter(text__icontains=word)
+                like = like.order_by('-pub_date', '-id')
+                fts = search.search_posts(posts, term)
+                for what, run in (
+                        ('page', lambda qs: list(qs[:POSTS_PER_PAGE])),
+                        ('count', lambda qs: qs.count())):
+                    self.stdout.write('%-12s %-6s %12.2f %12.2f' % (
+                        term, what,
+                        best_of(lambda: run(like), options['repeat']),
+                        best_of(lambda: run(fts), options['repeat'])))
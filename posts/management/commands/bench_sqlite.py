@@ -0,0 +1,73 @@
+import importlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts.bench import scratch_database, seed_site, stress_views
+
+DATABASE_KEYS = ('ENGINE', 'CONN_MAX_AGE', 'OPTIONS')
+
+
+def profiles():
+    """(name, DATABASES entries, SQLITE_PRAGMAS): the stock settings
+    against yatube.settings_production"""
+    # only the database settings are read here, any key will do
+    missing = 'SECRET_KEY' not in os.environ
+    if missing:
+        os.environ['SECRET_KEY'] = 'bench_sqlite'
+    try:
+        production = importlib.import_module('yatube.settings_production')
+    finally:
+        if missing:
+            del os.environ['SECRET_KEY']
+    database = production.DATABASES['default']
+    return [
+        ('default', {'ENGINE': 'django.db.backends.sqlite3',
+                     'CONN_MAX_AGE': 0, 'OPTIONS': {}}, {}),
+        ('production', {key: database[key] for key in DATABASE_KEYS},
+         production.SQLITE_PRAGMAS),
+    ]
+
+
+class Command(BaseCommand):
+    help = ('Stress test: concurrent readers and writers against a file '
+            'database, with the default and the production SQLite settings')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--posts', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stderr.write('bench_sqlite needs an SQLite database')
+            return
+        self.stdout.write('%-11s %-6s %9s %9s %9s %7s' % (
+            'profile', 'kind', 'req/s', 'p50 ms', 'p95 ms', 'errors'))
+        saved = {key: connection.settings_dict[key] for key in DATABASE_KEYS}
+        for name, database, pragmas in profiles():
+            with tempfile.TemporaryDirectory() as root, \
+                    override_settings(SQLITE_PRAGMAS=pragmas), \
+                    scratch_database(os.path.join(root, 'stress.sqlite3')):
+                # the same dict the threads open their connections from
+                connection.settings_dict.update(database)
+                connection.close()
+                try:
+                    reader, author, post, _ = seed_site(options['posts'], authors=50)
+                    cache.clear()
+                    summary = stress_views(
+                        reader, author, post, threads=options['threads'],
+                        writers=options['writers'], seconds=options['seconds'])
+                finally:
+                    connection.settings_dict.update(saved)
+            for kind, row in summary.items():
+                self.stdout.write('%-11s %-6s %9.1f %9s %9s %7s' % (
+                    name, kind, row['per_s'], row['p50_ms'], row['p95_ms'], row['errors']))
+        if settings.DEBUG:
+            self.stdout.write('(DEBUG is on: every query is also kept in connection.queries)')
@@ -0,0 +1,84 @@
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from posts.bench import (
+    regressions, run_views, scratch_database, seed_site, view_scenarios)
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks every view of the posts app through the test client'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--authors', type=int, default=100)
+        parser.add_argument('--comments', type=int, default=50,
+                            help='comments on the benchmarked post')
+        parser.add_argument('--follows', type=int, default=20,
+                            help='authors the reader follows')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--cold', action='store_true',
+                            help='clear the cache before every request')
+        parser.add_argument('--output', help='write the results to this JSON file')
+        parser.add_argument('--compare', help='JSON file of an earlier run')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='allowed slowdown against --compare')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['views']
+
+        # the test client needs the "testserver" host and the instrumented
+        # template rendering that fills response.context
+        setup_test_environment()
+        try:
+            with scratch_database():
+                dataset = seed_site(
+                    options['posts'], authors=options['authors'],
+                    comments=options['comments'], follows=options['follows'],
+                    stdout=self.stdout)
+                reader = dataset[0]
+                results = run_views(
+                    view_scenarios(*dataset), reader,
+                    repeat=options['repeat'], warmup=options['warmup'],
+                    cold=options['cold'])
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write('%-18s %6s %7s %9s %9s %9s %9s' % (
+            'view', 'status', 'queries', 'sql ms', 'tmpl ms', 'p50 ms', 'p95 ms'))
+        for name, row in results.items():
+            self.stdout.write('%-18s %6s %7s %9.2f %9.2f %9.2f %9.2f' % (
+                name, row['status'], row['queries'], row['sql_ms'],
+                row['template_ms'], row['p50_ms'], row['p95_ms']))
+
+        if options['output']:
+            report = {
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'options': {key: options[key] for key in (
+                    'posts', 'authors', 'comments', 'follows',
+                    'repeat', 'warmup', 'cold')},
+                'views': results,
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write('Saved to %s' % options['output'])
+
+        if baseline is not None:
+            found = regressions(results, baseline, options['threshold'])
+            for name, reason in found:
+                self.stderr.write('REGRESSION %s: %s' % (name, reason))
+            if found:
+                raise CommandError('%s regressions against %s' % (
+                    len(found), options['compare']))
+            self.stdout.write(self.style.SUCCESS(
+                'No regressions against %s' % options['compare']))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.models import Comment, Post, TimelineEntry
+from posts.paginator import POSTS_PER_PAGE, CursorPaginator
+
+
+def feed_queries():
+    """(view, queryset) pairs shaped like the main query of each view"""
+    # ids do not need to exist, the plan only depends on the query shape
+    cursor = CursorPaginator(Post.objects.none(), 1).encode_cursor(
+        Post(pk=1, pub_date=timezone.now()))
+    feeds = (
+        ('index', Post.objects.for_feed()),
+        ('group_posts', Post.objects.for_feed().filter(group_id=1)),
+        ('profile', Post.objects.for_feed().filter(author_id=1)),
+        ('follow_index', TimelineEntry.objects.filter(user_id=1)),
+    )
+    for name, queryset in feeds:
+        paginator = CursorPaginator(queryset, POSTS_PER_PAGE)
+        yield name, paginator.page_queryset()
+        yield name + ' ?after=', paginator.page_queryset(after=cursor)
+    yield 'post_view', Comment.objects.filter(post_id=1).order_by('-created', '-id')
+
+
+class Command(BaseCommand):
+    help = 'Prints EXPLAIN QUERY PLAN for the main query of every feed view'
+
+    def handle(self, *args, **options):
+        for name, queryset in feed_queries():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import Throughput, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Streams users, groups, posts, comments and follows as JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='file to write, "-" for stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        to_stdout = options['output'] == '-'
+        output = sys.stdout if to_stdout else open(
+            options['output'], 'w', encoding='utf-8')
+        # progress goes to stderr when the data goes to stdout
+        progress = self.stderr if to_stdout else self.stdout
+        throughput = Throughput()
+        try:
+            for name, line in export_lines(options['chunk_size']):
+                output.write(line)
+                output.write('\n')
+                if name != 'header':
+                    throughput.add(name)
+                if throughput.total % 10000 == 0:
+                    progress.write('\r%s rows, %.0f rows/s' % (
+                        throughput.total, throughput.rate()), ending='')
+                    progress.flush()
+        finally:
+            if not to_stdout:
+                output.close()
+        progress.write('')
+        progress.write(self.style.SUCCESS('Exported %s' % throughput.summary()))
@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import Importer, search_triggers_off
+
+
+class Command(BaseCommand):
+    help = 'Imports a JSONL file written by export_yatube with bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='file to read, "-" for stdin')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='leave counters and timelines to reconcile_counters and '
+                 'rebuild_timelines')
+        parser.add_argument(
+            '--thumbnails', action='store_true',
+            help='run warm_thumbnails afterwards, the image files must '
+                 'already be in MEDIA_ROOT')
+
+    def handle(self, *args, **options):
+        source = sys.stdin if options['input'] == '-' else open(
+            options['input'], encoding='utf-8')
+        importer = Importer(options['batch_size'], stdout=self.stdout)
+        try:
+            with search_triggers_off():
+                importer.run(source)
+        except ValueError as exc:
+            raise CommandError(exc)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        self.stdout.write('')
+        self.stdout.write('Imported %s' % importer.throughput.summary())
+
+        if not options['no_rebuild']:
+            importer.rebuild_derived()
+            self.stdout.write('Rebuilt counters, timelines and the search index')
+        if options['thumbnails']:
+            from django.core.management import call_command
+            call_command('warm_thumbnails', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,65 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import images
+from posts.management.commands.warm_thumbnails import close_connections
+from posts.models import ImageJob
+
+
+class Command(BaseCommand):
+    help = 'Works through the queue of uploaded post images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1)
+        parser.add_argument(
+            '--batch-size', type=int, default=32,
+            help='jobs claimed per round')
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='seconds to wait when the queue is empty')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='exit when the queue is empty instead of polling')
+
+    def handle(self, *args, **options):
+        # one worker command per database: anything still running is orphaned
+        stale = images.requeue_stale()
+        if stale:
+            self.stdout.write('Requeued %s interrupted jobs' % stale)
+
+        pool = None
+        if options['processes'] > 1:
+            close_connections()
+            pool = multiprocessing.Pool(
+                options['processes'], initializer=close_connections)
+        run = pool.imap_unordered if pool is not None else map
+
+        done = failed = 0
+        started = time.monotonic()
+        try:
+            while True:
+                claimed = images.claim(options['batch_size'])
+                if not claimed:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                for job_id, status in run(images.run_job, claimed):
+                    done += status == ImageJob.DONE
+                    failed += status == ImageJob.FAILED
+                self.stdout.write('%s processed, %s failed, %.1f/s' % (
+                    done, failed, done / max(time.monotonic() - started, 1e-9)))
+        except KeyboardInterrupt:
+            # the claimed jobs are requeued on the next start
+            if pool is not None:
+                pool.terminate()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        self.stdout.write(self.style.SUCCESS(
+            'Processed %s images (%s failed)' % (done, failed)))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Recreates the search triggers if needed and reindexes every post'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--optimize', action='store_true',
+            help='merge the index segments afterwards')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search.ensure_index(using):
+            search.rebuild(using)
+        if options['optimize']:
+            search.optimize(using)
+        self.stdout.write(self.style.SUCCESS(
+            'Indexed %s posts' % Post.objects.using(using).count()))
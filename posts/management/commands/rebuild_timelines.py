@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import timeline
+from posts.models import Follow, User
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the follow feed timelines from existing Follow and Post rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='only rebuild these users (default: everyone who follows someone)')
+
+    def handle(self, *args, **options):
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(
+                users.values_list('username', flat=True))
+            if missing:
+                raise CommandError('Unknown users: %s' % ', '.join(sorted(missing)))
+            user_ids = users.values_list('id', flat=True)
+        else:
+            user_ids = (
+                Follow.objects.order_by('user_id')
+                .values_list('user_id', flat=True).distinct()
+            )
+
+        rebuilt = 0
+        for user_id in user_ids.iterator():
+            with transaction.atomic():
+                timeline.rebuild(user_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt %s timelines' % rebuilt))
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.utils import timezone
+
+from posts import counters
+from posts.models import Post, User, UserStats
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Recounts UserStats and Post.comments_count and repairs any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='only report drifted rows')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        users = self.reconcile_users(dry_run)
+        posts = self.reconcile_posts(dry_run)
+        verb = 'Found' if dry_run else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            '%s %s user stats and %s post comment counts' % (verb, users, posts)))
+
+    def reconcile_users(self, dry_run):
+        fields = ('posts_count', 'followers_count', 'following_count')
+        drifted = User.objects.annotate(**counters.real_user_counts()).filter(
+            Q(stats=None) | Q(
+                *[~Q(**{'stats__%s' % f: F('real_%s' % f)}) for f in fields],
+                _connector=Q.OR,
+            )
+        ).values_list('pk', *['real_%s' % f for f in fields])
+
+        # materialized: SQLite gives no isolation between reading a table
+        # and updating it on the same connection
+        repaired = 0
+        batch = []
+        for user_id, *values in list(drifted):
+            repaired += 1
+            batch.append(UserStats(user_id=user_id, **dict(zip(fields, values))))
+            if len(batch) >= BATCH_SIZE and not dry_run:
+                self.save_stats(batch)
+                batch = []
+        if batch and not dry_run:
+            self.save_stats(batch)
+        return repaired
+
+    def save_stats(self, batch):
+        existing = set(UserStats.objects.filter(
+            user_id__in=[stats.user_id for stats in batch]
+        ).values_list('user_id', flat=True))
+        UserStats.objects.bulk_update(
+            [stats for stats in batch if stats.user_id in existing],
+            ('posts_count', 'followers_count', 'following_count'),
+        )
+        UserStats.objects.bulk_create(
+            [stats for stats in batch if stats.user_id not in existing])
+
+    def reconcile_posts(self, dry_run):
+        drifted = (
+            Post.objects.annotate(real=counters.real_comments_count())
+            .exclude(comments_count=F('real'))
+            .values_list('pk', 'real')
+        )
+        repaired = 0
+        batch = []
+        now = timezone.now()
+        for post_id, real in list(drifted):
+            repaired += 1
+            batch.append(Post(pk=post_id, comments_count=real, updated=now))
+            if len(batch) >= BATCH_SIZE and not dry_run:
+                Post.objects.bulk_update(batch, ['comments_count', 'updated'])
+                batch = []
+        if batch and not dry_run:
+            Post.objects.bulk_update(batch, ['comments_count', 'updated'])
+        return repaired
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import replicas
+
+
+class Command(BaseCommand):
+    help = 'Copies the primary database into the read replicas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append',
+            help='replica alias, repeat for several; all of DATABASE_REPLICAS by default')
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='keep refreshing every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        aliases = options['database'] or settings.DATABASE_REPLICAS
+        unknown = set(aliases) - set(settings.DATABASE_REPLICAS)
+        if unknown:
+            raise CommandError('not in DATABASE_REPLICAS: %s' % ', '.join(sorted(unknown)))
+        if not aliases:
+            raise CommandError('no replicas configured, set YATUBE_REPLICAS')
+        while True:
+            for alias in aliases:
+                started = time.perf_counter()
+                replicas.refresh(alias)
+                self.stdout.write('%s refreshed in %.0f ms' % (
+                    alias, (time.perf_counter() - started) * 1000))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import generations
+from posts.models import Post
+from posts.text import make_preview, render_html
+
+
+class Command(BaseCommand):
+    help = 'Fills Post.text_html and Post.preview for posts that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='re-render every post, e.g. after posts.text changed')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.order_by('pk').only('pk', 'text', 'author_id', 'group_id')
+        if not options['all']:
+            posts = posts.filter(text_html='')
+        rendered = 0
+        scopes = set()
+        last_pk = 0
+        while True:
+            # keyset batches: rows leave the text_html='' filter as we go
+            batch = list(posts.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            now = timezone.now()
+            for post in batch:
+                post.text_html = render_html(post.text)
+                post.preview = make_preview(post.text)
+                # new cache keys for the cards of these posts
+                post.updated = now
+                scopes.update(generations.post_scopes(post.author_id, post.group_id))
+            Post.objects.bulk_update(batch, ['text_html', 'preview', 'updated'])
+            rendered += len(batch)
+            last_pk = batch[-1].pk
+        if scopes:
+            generations.bump(*sorted(scopes))
+        self.stdout.write(self.style.SUCCESS('Rendered %s posts' % rendered))
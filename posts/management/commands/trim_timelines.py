@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = ('Drops the follow feed entries past the newest TIMELINE_LENGTH '
+            'of every user; run it periodically, new posts do not trim')
+
+    def handle(self, *args, **options):
+        dropped = timeline.trim()
+        self.stdout.write(self.style.SUCCESS(
+            'Dropped %s timeline entries' % dropped))
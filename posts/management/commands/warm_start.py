@@ -0,0 +1,21 @@
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.warmup import warm_start
+
+
+class Command(BaseCommand):
+    help = ('Compiles the templates and renders the first feed pages, which '
+            'fills a cache shared by the workers once per deploy')
+
+    def handle(self, *args, **options):
+        report = warm_start(WSGIHandler())
+        if report is None:
+            raise CommandError('warm start failed, see the posts.startup log')
+        self.stdout.write('%s templates compiled in %.0f ms' % (
+            report['templates'], report['steps']['templates']))
+        for name in report['failed']:
+            self.stderr.write('does not compile: %s' % name)
+        for url, status in report['pages'].items():
+            self.stdout.write('%s %s' % (status, url))
+        self.stdout.write('done in %.0f ms' % report['total_ms'])
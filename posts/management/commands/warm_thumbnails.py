@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+DEFAULT_CHECKPOINT = os.path.join(
+    settings.MEDIA_ROOT, 'cache', 'warm_thumbnails.checkpoint')
+
+
+def warm(row):
+    """worker: (post id, image name) -> (post id, created)"""
+    post_id, image_name = row
+    return post_id, thumbnails.pregenerate(image_name)
+
+
+def iter_rows(queryset, batch_size=1000):
+    """(pk, image) rows in short keyset batches: a cursor held open for the
+    whole run would keep SQLite locked against the workers' writes"""
+    last_pk = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_pk).values_list('pk', 'image')[:batch_size])
+        if not batch:
+            return
+        yield from batch
+        last_pk = batch[-1][0]
+
+
+def close_connections():
+    # forked workers must not share the parent's database connections
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Creates the feed thumbnails of every post image in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--chunk-size', type=int, default=16)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='continue after the last post recorded in the checkpoint')
+        parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint']
+        start_after = 0
+        if options['resume'] and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                start_after = int(f.read().strip() or 0)
+            self.stdout.write('Resuming after post %s' % start_after)
+
+        posts = (
+            Post.objects.filter(pk__gt=start_after)
+            .exclude(image='').exclude(image=None)
+            .order_by('pk')
+        )
+        total = posts.count()
+        rows = iter_rows(posts)
+
+        done = failed = 0
+        started = time.monotonic()
+        pool = None
+        if options['processes'] > 1:
+            close_connections()
+            pool = multiprocessing.Pool(
+                options['processes'], initializer=close_connections)
+            results = pool.imap(warm, rows, options['chunk_size'])
+        else:
+            results = map(warm, rows)
+        try:
+            # imap keeps post order, so the checkpoint is always a prefix
+            for post_id, created in results:
+                done += 1
+                failed += not created
+                if done % 100 == 0 or done == total:
+                    self.write_checkpoint(checkpoint, post_id)
+                    self.stdout.write('\r%s/%s thumbnails, %s failed, %.1f/s' % (
+                        done, total, failed,
+                        done / max(time.monotonic() - started, 1e-9),
+                    ), ending='')
+                    self.stdout.flush()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            'Warmed %s thumbnails (%s failed)' % (done - failed, failed)))
+
+    def write_checkpoint(self, path, post_id):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(str(post_id))
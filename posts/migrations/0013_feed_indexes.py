@@ -0,0 +1,51 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+def dedupe_follows(apps, schema_editor):
+    """keep the oldest of duplicated Follow rows before adding the constraint"""
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    duplicated = (
+        Follow.objects.values('user_id', 'author_id')
+        .annotate(first_id=models.Min('id'), rows=models.Count('id'))
+        .filter(rows__gt=1)
+    )
+    for pair in duplicated:
+        Follow.objects.filter(
+            user_id=pair['user_id'], author_id=pair['author_id'],
+        ).exclude(id=pair['first_id']).delete()
+        # the counters filled in 0012 counted every duplicate
+        extra = pair['rows'] - 1
+        UserStats.objects.filter(user_id=pair['user_id']).update(
+            following_count=models.F('following_count') - extra)
+        UserStats.objects.filter(user_id=pair['author_id']).update(
+            followers_count=models.F('followers_count') - extra)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_follows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created', '-id'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date', '-id'], name='post_group_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='follow_unique_user_author'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.models
+
+
+def create_search_index(apps, schema_editor):
+    from posts import search
+    search.ensure_index(schema_editor.connection.alias)
+
+
+def drop_search_index(apps, schema_editor):
+    from posts import search
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in search.TRIGGERS:
+        schema_editor.execute('DROP TRIGGER IF EXISTS %s' % name)
+    schema_editor.execute('DROP TABLE IF EXISTS %s' % search.TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_imagejob'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.CreateModel(
+            name='PostSearch',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='posts.Post')),
+                ('text', posts.models.SearchField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'posts_post_fts',
+                'managed': False,
+            },
+        ),
+    ]
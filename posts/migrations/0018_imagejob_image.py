@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_text_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagejob',
+            name='image',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
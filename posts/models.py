@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .text import PREVIEW_LENGTH, make_preview, render_html
+
 
 # Create your models here.
 User = get_user_model()
@@ -16,6 +18,15 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+
+    def for_feed(self):
+        """everything post_item.html needs in a single query:
+        author and group joined, comments counted in comments_count;
+        the raw text stays in the database, cards show text_html"""
+        return self.select_related('author', 'group').defer('text')
+
+
 class Post(models.Model):
     """creating a Post model"""
     text = models.TextField()
@@ -28,9 +39,51 @@ class Post(models.Model):
                               blank=True, null=True, related_name="posts")
     # поле для картинки
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    # the upload waits in an ImageJob, cards show a placeholder meanwhile
+    image_pending = models.BooleanField(default=False, editable=False)
+    # maintained by posts.counters
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # part of the cached card's key (posts.cards): auto_now on save, and
+    # posts.counters moves it along with comments_count
+    updated = models.DateTimeField("updated", auto_now=True)
+    # text rendered once on save (render_text), templates output it as is
+    text_html = models.TextField(default="", editable=False)
+    preview = models.CharField(max_length=PREVIEW_LENGTH, default="", editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ["-pub_date"]
+        indexes = [
+            # keyset pagination of the feeds walks (pub_date, id)
+            models.Index(fields=["pub_date", "id"], name="post_pub_date_id_idx"),
+            # profile and group feeds
+            models.Index(fields=["author", "-pub_date", "-id"],
+                         name="post_author_pub_date_idx"),
+            models.Index(fields=["group", "-pub_date", "-id"],
+                         name="post_group_pub_date_idx"),
+        ]
+
+    def render_text(self):
+        """fill text_html and preview from text; save() calls it, code
+        that bypasses save() (bulk_create) has to call it itself"""
+        self.text_html = render_html(self.text)
+        self.preview = make_preview(self.text)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            self.render_text()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'text_html', 'preview'}
+        # comments_count is only changed with F() by posts.counters,
+        # saving a stale instance must not overwrite it
+        if not self._state.adding and not kwargs.get('update_fields'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comments_count'
+            ]
+        super().save(*args, **kwargs)
 
 
 class Comment(models.Model):
@@ -44,10 +97,105 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            # comments of one post on post_view
+            models.Index(fields=["post", "-created", "-id"],
+                         name="comment_post_created_idx"),
+        ]
 
 
 class Follow(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='follower')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "author"],
+                                    name="follow_unique_user_author"),
+        ]
+
+
+class ImageJob(models.Model):
+    """queued post-processing of an uploaded post image (posts.images)"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'pending'),
+        (RUNNING, 'running'),
+        (DONE, 'done'),
+        (FAILED, 'failed'),
+    )
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="image_jobs")
+    # name of the queued upload, a later edit may have replaced it
+    image = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField("created", auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"], name="imagejob_status_idx"),
+        ]
+
+
+class UserStats(models.Model):
+    """per-user counters shown on the profile, maintained by posts.counters"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name="stats")
+    posts_count = models.PositiveIntegerField(default=0)
+    # Follow rows with this user as author / as user
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
+class TimelineEntry(models.Model):
+    """materialized follow feed: one row per post per follower"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="timeline")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="timeline_entries")
+    # copy of post.pub_date, so the feed is read from this table alone
+    pub_date = models.DateTimeField("date published")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "pub_date", "id"],
+                         name="timeline_user_pub_date_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "post"],
+                                    name="timeline_unique_user_post"),
+        ]
+
+
+class SearchField(models.TextField):
+    """a column of an FTS5 table, supports the `match` lookup"""
+
+
+@SearchField.register_lookup
+class Match(models.Lookup):
+    lookup_name = "match"
 
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return "%s MATCH %s" % (lhs, rhs), lhs_params + rhs_params
+
+
+class PostSearch(models.Model):
+    """the FTS5 index over Post.text, maintained by triggers (posts.search)"""
+    post = models.OneToOneField(Post, on_delete=models.DO_NOTHING,
+                                primary_key=True, db_column="rowid",
+                                related_name="search")
+    text = SearchField()
+    # FTS5 hidden column, bm25() of the current MATCH, lower is better
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "posts_post_fts"
@@ -0,0 +1,173 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.shortcuts import redirect
+from django.utils.dateparse import parse_datetime
+
+# page sizes of the HTML feeds and of the JSON API alike
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+
+class CursorPage:
+    """one page of a cursor (keyset) paginated queryset"""
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of %s items>' % len(self)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Paginates a queryset by (date_field, id) instead of OFFSET.
+
+    Every page is fetched with a single "WHERE (date, id) < cursor
+    ORDER BY date DESC, id DESC LIMIT n + 1" query, so it costs the same
+    no matter how deep the user pages, and no COUNT(*) is ever run.
+    """
+
+    def __init__(self, object_list, per_page, date_field='pub_date'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.date_field = date_field
+
+    def encode_cursor(self, obj):
+        if isinstance(obj, dict):
+            # a row of .values(), which must include the date field and id
+            date, pk = obj[self.date_field], obj['id']
+        else:
+            date, pk = getattr(obj, self.date_field), obj.pk
+        value = '%s|%s' % (date.isoformat(), pk)
+        return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """returns (date, pk) or None for a broken token"""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            value = base64.urlsafe_b64decode(padded.encode()).decode()
+            date, pk = value.rsplit('|', 1)
+            date = parse_datetime(date)
+            pk = int(pk)
+        except (binascii.Error, UnicodeError, ValueError):
+            return None
+        if date is None:
+            return None
+        return date, pk
+
+    def _keyset(self, position, older):
+        # (date <= d) AND (date < d OR pk < id): the first half bounds the
+        # index range scan, a bare OR would make SQLite walk the whole index
+        date, pk = position
+        lookup = 'lt' if older else 'gt'
+        return (
+            Q(**{'%s__%se' % (self.date_field, lookup): date})
+            & (Q(**{'%s__%s' % (self.date_field, lookup): date})
+               | Q(**{'pk__%s' % lookup: pk}))
+        )
+
+    def page_queryset(self, after=None, before=None):
+        """the single LIMIT-ed query that fetches a page (one extra row
+        tells whether there is more); rows come newest first unless
+        `before` is given"""
+        after = self.decode_cursor(after)
+        before = None if after else self.decode_cursor(before)
+        if before:
+            queryset = self.object_list.filter(self._keyset(before, older=False))
+            ordering = (self.date_field, 'pk')
+        else:
+            queryset = self.object_list
+            if after:
+                queryset = queryset.filter(self._keyset(after, older=True))
+            ordering = ('-%s' % self.date_field, '-pk')
+        return queryset.order_by(*ordering)[:self.per_page + 1]
+
+    def page(self, after=None, before=None):
+        """page of objects older than `after` or newer than `before`"""
+        after_position = self.decode_cursor(after)
+        rows = list(self.page_queryset(after, before))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if not after_position and self.decode_cursor(before):
+            rows.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = after_position is not None, has_more
+
+        if not rows:
+            return CursorPage(rows, self)
+        return CursorPage(
+            rows,
+            self,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor(rows[0]) if has_previous else None,
+        )
+
+    def get_page(self, request):
+        return self.page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+
+    def cursor_for_page_number(self, number):
+        """Cursor that starts the old numbered page, None for the first one.
+
+        Used only to redirect legacy ?page=N links, so the OFFSET scan is
+        paid once per old link rather than on every page view.
+        """
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return None
+        if number <= 1:
+            return None
+        last = self.object_at((number - 1) * self.per_page - 1)
+        if last is None:
+            return None
+        return self.encode_cursor(last)
+
+    def object_at(self, offset):
+        """the object `offset` places from the newest, None past the end"""
+        newest_first = ('-%s' % self.date_field, '-pk')
+        found = list(self.object_list.order_by(*newest_first)[offset:offset + 1])
+        return found[0] if found else None
+
+
+def legacy_page_redirect(request, paginator):
+    """redirect an old ?page=N link to its cursor, None if there is no ?page"""
+    if 'page' not in request.GET:
+        return None
+    params = request.GET.copy()
+    cursor = paginator.cursor_for_page_number(params.pop('page')[-1])
+    params.pop('after', None)
+    params.pop('before', None)
+    if cursor:
+        params['after'] = cursor
+    query = params.urlencode()
+    return redirect(request.path + ('?' + query if query else ''))
@@ -0,0 +1,147 @@
+"""Read replicas for the feed views, with read-your-writes stickiness.
+
+settings.DATABASE_REPLICAS lists read-only copies of the primary
+(`default`) database; refresh() copies the primary into one of them and
+the refresh_replica command does it periodically. Without replicas
+everything here is a no-op.
+
+Only the views behind conditional_feed read from a replica, and only
+after use_replica() finds one that is fresh enough: the refresh time of
+the copy, kept in the cache, must be past the last change of every
+scope the page shows (the same timestamps that give Last-Modified). A
+page built from a copy that misses a change would otherwise be cached
+under the new generation for everybody.
+
+ReplicaMiddleware keeps the routing state of the request. Once the
+request writes to the primary, the rest of it reads from there too, and
+the response sets a cookie that keeps the client on the primary for
+REPLICA_PIN_SECONDS, so an author never sees a feed without the post
+they just wrote.
+"""
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_until'
+# bumps happen in signals, before the transaction commits; a copy made
+# within this many seconds after a bump may still miss the change
+FRESHNESS_MARGIN = 2
+# read from the primary even inside a replica request
+PRIMARY_APPS = {'sessions'}
+WRITES = {'INSERT ', 'UPDATE ', 'DELETE ', 'REPLACE'}
+
+_local = threading.local()
+
+
+class _State:
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.replica = None
+        self.wrote = False
+
+
+def _current():
+    return getattr(_local, 'state', None)
+
+
+def _synced_key(alias):
+    return 'replica-synced:%s' % alias
+
+
+def use_replica(changed=0):
+    """send the rest of this request's reads to a replica that has every
+    change made up to `changed` (a timestamp), if there is one"""
+    state = _current()
+    replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+    if state is None or state.pinned or state.wrote or not replicas:
+        return None
+    synced = cache.get_many([_synced_key(alias) for alias in replicas])
+    fresh = [
+        alias for alias in replicas
+        if synced.get(_synced_key(alias), 0) >= changed + FRESHNESS_MARGIN
+    ]
+    if fresh:
+        state.replica = random.choice(fresh)
+    return state.replica
+
+
+def refresh(alias):
+    """copy the primary into the replica `alias` with SQLite's backup API,
+    which gives a consistent snapshot while the primary keeps writing"""
+    started = time.time()
+    primary = connections[DEFAULT_DB_ALIAS]
+    primary.ensure_connection()
+    target = sqlite3.connect(connections[alias].settings_dict['NAME'], timeout=30)
+    try:
+        primary.connection.backup(target)
+    finally:
+        target.close()
+    # everything committed before `started` is in the copy
+    cache.set(_synced_key(alias), started, None)
+    return started
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _current()
+        if state is None or state.replica is None:
+            return None
+        if model._meta.app_label in PRIMARY_APPS:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        # never the instance's own database, which may be a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *getattr(settings, 'DATABASE_REPLICAS', ())}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, 'DATABASE_REPLICAS', ()):
+            return False
+        return None
+
+
+def _watch_writes(state):
+    # db_for_write() is also asked when a foreign key is merely assigned,
+    # so writes are told apart by their SQL
+    def execute(execute, sql, params, many, context):
+        if sql.lstrip()[:7].upper() in WRITES:
+            # the rest of the request must see this write
+            state.wrote = True
+            state.replica = None
+        return execute(sql, params, many, context)
+    return execute
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned = float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        state = _local.state = _State(pinned)
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(_watch_writes(state)):
+                response = self.get_response(request)
+        finally:
+            _local.state = None
+        if state.wrote and getattr(settings, 'DATABASE_REPLICAS', ()):
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, '%d' % (time.time() + seconds), max_age=seconds,
+                httponly=True, samesite='Lax')
+        return response
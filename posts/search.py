@@ -0,0 +1,104 @@
+"""Full-text search over Post.text with an SQLite FTS5 index.
+
+posts_post_fts is an external-content FTS5 table: it stores only the
+index, the text itself is read from posts_post. Triggers on posts_post
+keep it in sync, so bulk_create, queryset updates and deletes are covered
+as well as Post.save(). SQLite drops the triggers whenever a migration
+rebuilds posts_post, so ensure_index() runs after every migrate and
+rebuilds the index if they had to be recreated.
+"""
+import re
+
+from django.db import connections
+
+TABLE = 'posts_post_fts'
+
+CREATE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5("
+    "text, content='posts_post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+
+TRIGGERS = {
+    'posts_post_fts_insert': (
+        "CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert "
+        "AFTER INSERT ON posts_post BEGIN "
+        "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+        "END"
+    ),
+    'posts_post_fts_delete': (
+        "CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete "
+        "AFTER DELETE ON posts_post BEGIN "
+        "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+        "VALUES ('delete', old.id, old.text); "
+        "END"
+    ),
+    # Post.save() writes every column, only reindex when the text changed
+    'posts_post_fts_update': (
+        "CREATE TRIGGER IF NOT EXISTS posts_post_fts_update "
+        "AFTER UPDATE OF text ON posts_post WHEN old.text IS NOT new.text BEGIN "
+        "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+        "VALUES ('delete', old.id, old.text); "
+        "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+        "END"
+    ),
+}
+
+# relevance ranking is not keyset-friendly, search pages stop here
+MAX_RESULTS = 1000
+
+WORD_RE = re.compile(r'\w+')
+
+
+def to_match(query):
+    """user input -> FTS5 query: every word as a quoted prefix, all required;
+    None when there is nothing to search for"""
+    words = WORD_RE.findall(query.lower())
+    if not words:
+        return None
+    return ' '.join('"%s"*' % word for word in words)
+
+
+def rebuild(using='default'):
+    """reindex every post from posts_post"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')")
+
+
+def optimize(using='default'):
+    """merge the index b-trees, worth it after large imports"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('optimize')")
+
+
+def ensure_index(using='default'):
+    """create the FTS table and its triggers where missing, returns True
+    if anything was (re)created and the index had to be rebuilt"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') "
+            "AND (name = %s OR tbl_name = 'posts_post')", [TABLE])
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in (TABLE, *TRIGGERS) if name not in existing]
+        if not missing:
+            return False
+        cursor.execute(CREATE_TABLE)
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+    rebuild(using)
+    return True
+
+
+def search_posts(queryset, query):
+    """`queryset` narrowed to the posts matching `query`, best match first,
+    newer posts first among equally relevant ones"""
+    match = to_match(query)
+    if match is None:
+        return queryset.none()
+    return queryset.filter(search__text__match=match).order_by(
+        'search__rank', '-pub_date', '-id')
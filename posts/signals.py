@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (
+    counters, follow_graph, follows, generations, pull_feed, thumbnails, timeline,
+)
+from .models import Comment, Follow, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.add_to_user(instance.author_id, posts_count=1)
+        pull_feed.post_created(instance)
+        if timeline.enabled():
+            timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_image_saved(sender, instance, raw=False, **kwargs):
+    # resize now, not inside the first feed request that shows the post;
+    # a fresh upload is resized by the image worker once it is processed
+    if instance.image and not instance.image_pending and not raw:
+        image_name = instance.image.name
+        transaction.on_commit(lambda: thumbnails.pregenerate(image_name))
+
+
+@receiver(pre_save, sender=Post)
+def post_moving_group(sender, instance, raw=False, **kwargs):
+    # an edit may move the post out of a group, that group's pages change too
+    if instance.pk is None or raw:
+        return
+    old_group_id = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('group_id', flat=True).first()
+    )
+    if old_group_id is not None and old_group_id != instance.group_id:
+        generations.bump('group:%s' % old_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.add_to_user(instance.author_id, posts_count=-1)
+    pull_feed.post_deleted(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    generations.bump(
+        *generations.post_scopes(instance.author_id, instance.group_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.post_id is not None:
+        counters.add_to_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id is not None:
+        counters.add_to_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    # the comment count on the post card changed
+    post = (
+        Post.objects.filter(pk=instance.post_id)
+        .values('author_id', 'group_id').first()
+    )
+    if post is not None:
+        generations.bump(
+            *generations.post_scopes(post['author_id'], post['group_id']))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.add_to_user(instance.user_id, following_count=1)
+        counters.add_to_user(instance.author_id, followers_count=1)
+        if timeline.enabled():
+            timeline.backfill(instance.user_id, instance.author_id)
+        follow_graph.followed(instance.user_id, instance.author_id)
+        generations.bump(*generations.follow_scopes(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    deleted = follows.bulk_deleted()
+    if deleted is not None:
+        # posts.follows.unfollow_many updates the rest for all of them
+        deleted.append(instance.author_id)
+        return
+    counters.add_to_user(instance.user_id, following_count=-1)
+    counters.add_to_user(instance.author_id, followers_count=-1)
+    if timeline.enabled():
+        timeline.remove(instance.user_id, instance.author_id)
+    follow_graph.unfollowed(instance.user_id, instance.author_id)
+    generations.bump(*generations.follow_scopes(instance))
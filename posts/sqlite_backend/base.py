@@ -0,0 +1,18 @@
+"""SQLite backend whose transactions take the write lock up front.
+
+Django opens transactions with a plain (deferred) BEGIN. In WAL mode a
+deferred transaction that has read and then writes fails at once with
+"database is locked" if another connection committed in between: its
+snapshot is stale, so the busy timeout does not help. BEGIN IMMEDIATE
+waits for the write lock (up to busy_timeout) before the first read,
+so concurrent atomic views queue up instead of failing.
+
+ENGINE = 'posts.sqlite_backend', see yatube.settings_production.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,216 @@
+"""Cache backend shared by every process on a host, kept in one SQLite
+file in WAL mode.
+
+LocMemCache is private to each gunicorn worker: every worker warms its
+own copy, and a generation bumped in one worker is never seen by the
+others. Here all workers open the same table, with no cache server to
+run. In WAL mode readers never wait for the writer; every write is one
+short BEGIN IMMEDIATE transaction, which also makes incr() atomic across
+processes.
+
+Eviction is approximate LRU. A read moves an entry's access time forward
+at most once per TOUCH_INTERVAL, so hot keys do not turn every get into
+a write. Every CULL_EVERY writes of a process, expired entries are
+dropped, and above MAX_ENTRIES the least recently used ones go too:
+enough to bring the table down to MAX_ENTRIES less 1/CULL_FREQUENCY of
+it, as Django's own backends do.
+
+    CACHES = {'default': {
+        'BACKEND': 'posts.sqlite_cache.SQLiteCache',
+        'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }}
+"""
+import contextlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+    'expires REAL, accessed REAL NOT NULL) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+# seconds
+TOUCH_INTERVAL = 60
+CULL_EVERY = 100
+# stays under SQLITE_MAX_VARIABLE_NUMBER of old SQLite builds
+CHUNK_SIZE = 900
+
+
+def _chunks(items):
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+def _placeholders(items):
+    return ','.join('?' * len(items))
+
+
+class SQLiteCache(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        options = params.get('OPTIONS', {})
+        self.cull_every = int(options.get('CULL_EVERY', CULL_EVERY))
+        self._local = threading.local()
+
+    def _connection(self):
+        local = self._local
+        # a worker forked after the parent opened the file gets its own
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self.location, timeout=30, isolation_level=None,
+                check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection, local.pid, local.writes = connection, os.getpid(), 0
+        return local.connection
+
+    @contextlib.contextmanager
+    def _write(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        self._local.writes += 1
+        if self._local.writes % self.cull_every == 0:
+            self._cull()
+
+    def _cull(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+            count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+            if count > self._max_entries:
+                if self._cull_frequency == 0:
+                    connection.execute('DELETE FROM cache')
+                else:
+                    excess = count - self._max_entries
+                    excess += self._max_entries // self._cull_frequency
+                    connection.execute(
+                        'DELETE FROM cache WHERE key IN ('
+                        'SELECT key FROM cache ORDER BY accessed LIMIT ?)', (excess,))
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _read(self, keys):
+        """{key: value} of the live entries among `keys`"""
+        connection = self._connection()
+        now = time.time()
+        found, stale = {}, []
+        for chunk in _chunks(keys):
+            rows = connection.execute(
+                'SELECT key, value, accessed FROM cache WHERE key IN (%s) '
+                'AND (expires IS NULL OR expires > ?)' % _placeholders(chunk),
+                (*chunk, now))
+            for key, value, accessed in rows:
+                found[key] = pickle.loads(value)
+                if accessed < now - TOUCH_INTERVAL:
+                    stale.append(key)
+        if stale:
+            with self._write() as connection:
+                for chunk in _chunks(stale):
+                    connection.execute(
+                        'UPDATE cache SET accessed = ? WHERE key IN (%s)'
+                        % _placeholders(chunk), (now, *chunk))
+        return found
+
+    def _rows(self, data, timeout):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        return [
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires, now)
+            for key, value in data.items()
+        ]
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._read([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        found = self._read(list(made))
+        return {made[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        rows = self._rows(
+            {self._key(key, version): value for key, value in data.items()}, timeout)
+        with self._write() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)', rows)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        row, = self._rows({key: value}, timeout)
+        with self._write() as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?', (key, time.time()))
+            return connection.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)', row).rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        made = self._key(key, version)
+        with self._write() as connection:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)', (made, time.time())).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), made))
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            return connection.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time())).rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time())).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        with self._write() as connection:
+            for chunk in _chunks(keys):
+                connection.execute(
+                    'DELETE FROM cache WHERE key IN (%s)' % _placeholders(chunk), chunk)
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache')
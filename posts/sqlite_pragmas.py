@@ -0,0 +1,18 @@
+"""PRAGMAs for every new SQLite connection, taken from settings.SQLITE_PRAGMAS.
+
+PostsConfig.ready() connects apply() to connection_created. The
+development settings define none; yatube.settings_production turns on
+WAL, a busy timeout, mmap and a larger page cache.
+"""
+from django.conf import settings
+
+
+def apply(sender, connection, **kwargs):
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        # in order: busy_timeout goes first, so switching to WAL waits
+        # for other connections instead of failing
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA %s = %s' % (name, value))
@@ -0,0 +1,12 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """{% post_cards page %}: the cached cards of a page of posts"""
+    return mark_safe(cards.render_cards(posts, context.get('user')))
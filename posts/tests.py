@@ -211,8 +211,9 @@ class FollowTest(TestCase):
         self.post_2 = Post.objects.create(
             text=text_create_2,
             author=self.user_auth, group=self.group)
+        # a new post invalidates the cached feed right away
         response_next = self.auth_client.get(reverse("index"))
-        self.assertNotContains(response_next, text_create_2)
+        self.assertContains(response_next, text_create_2)
         post_update_2 = Post.objects.filter(author=self.user_auth).count()
         self.assertEqual(post_update_2, 2)
         cache.clear()
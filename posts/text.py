@@ -0,0 +1,20 @@
+"""Rendering of post text, done once when a post is written.
+
+Post.save() stores the results in text_html and preview; the data
+migration and the render_post_text command use the same functions for
+rows written before that or with bulk_create.
+"""
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+PREVIEW_LENGTH = 200
+
+
+def render_html(text):
+    """escaped text with <br> for line breaks, safe to output as is"""
+    return linebreaksbr(text, autoescape=True)
+
+
+def make_preview(text):
+    """the start of the text on one line, at most PREVIEW_LENGTH chars"""
+    return Truncator(' '.join(text.split())).chars(PREVIEW_LENGTH)
@@ -0,0 +1,58 @@
+"""Thumbnails of post images, generated ahead of the first page view.
+
+FEED_GEOMETRY and FEED_OPTIONS must stay in sync with the {% thumbnail %}
+tags in includes/post_item.html and group.html: sorl derives the cache
+key from them, so only an identical spec turns the tag into a lookup.
+"""
+import logging
+
+from django.core.cache import cache
+from sorl.thumbnail import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+FEED_GEOMETRY = '960x339'
+FEED_OPTIONS = {'crop': 'center', 'upscale': True}
+
+# the URL only changes with the image name or the spec, both are in the key
+URL_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def feed_thumbnail(image):
+    """the card thumbnail of `image`, created on the first call"""
+    return get_thumbnail(image, FEED_GEOMETRY, **FEED_OPTIONS)
+
+
+def pregenerate(image_name):
+    """create the card thumbnail, returns False if the image is unusable"""
+    try:
+        feed_thumbnail(image_name)
+    except Exception:
+        # a broken upload must not break saving the post
+        logger.exception('Could not create thumbnail for %s', image_name)
+        return False
+    return True
+
+
+def _url_key(image_name):
+    return 'thumbnail-url:%s:%s' % (FEED_GEOMETRY, image_name)
+
+
+def feed_thumbnail_urls(image_names):
+    """{image name: card thumbnail URL} in one cache round trip, sorl is
+    only asked (one lookup per image) for names not seen before"""
+    keys = {_url_key(name): name for name in image_names}
+    found = cache.get_many(list(keys))
+    urls = {keys[key]: url for key, url in found.items()}
+    resolved = {}
+    for key, name in keys.items():
+        if name in urls:
+            continue
+        try:
+            urls[name] = resolved[key] = feed_thumbnail(name).url
+        except Exception:
+            logger.exception('Could not create thumbnail for %s', name)
+            urls[name] = None
+    if resolved:
+        cache.set_many(resolved, URL_CACHE_TIMEOUT)
+    return urls
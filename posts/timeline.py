@@ -0,0 +1,127 @@
+"""Fan-out-on-write home timeline for follow_index.
+
+Every new post is copied into the TimelineEntry rows of the author's
+followers, so the follow feed is a range scan over one user's entries
+instead of a Post x Follow join on every request. The trim_timelines
+command, run periodically, cuts timelines back to TIMELINE_LENGTH.
+
+Timelines are only kept while settings.FOLLOW_FEED_ENGINE is 'timeline'
+(see enabled()): the pull engine (posts.pull_feed) reads none, so run
+rebuild_timelines before switching back to this one.
+"""
+from django.conf import settings
+
+from .models import Follow, Post, TimelineEntry
+from .paginator import CursorPaginator
+
+# how many entries a user's timeline keeps
+TIMELINE_LENGTH = 1000
+
+# Django 2.2 inserts on SQLite with one compound SELECT per batch, which
+# allows 500 terms, and 3 columns stay under 999 parameters
+BATCH_SIZE = 300
+
+
+# Django 2.2 cannot filter on a window function
+OVERFLOW_WHERE = (
+    '{table}.id IN (SELECT id FROM ('
+    'SELECT id, ROW_NUMBER() OVER ('
+    'PARTITION BY user_id ORDER BY pub_date DESC, id DESC) AS position '
+    'FROM {table}{users}'
+    ') AS ranked WHERE position > %s)'
+)
+# stays under SQLITE_MAX_VARIABLE_NUMBER of old SQLite builds
+CHUNK_SIZE = 900
+
+
+def _trim(user_ids):
+    table = TimelineEntry._meta.db_table
+    if user_ids is None:
+        users, params = '', []
+    else:
+        users = ' WHERE user_id IN (%s)' % ', '.join(['%s'] * len(user_ids))
+        params = list(user_ids)
+    where = OVERFLOW_WHERE.format(table=table, users=users)
+    return TimelineEntry.objects.extra(
+        where=[where], params=[*params, TIMELINE_LENGTH]).delete()[0]
+
+
+def trim(user_ids=None):
+    """drop everything past the newest TIMELINE_LENGTH entries of
+    `user_ids` (everybody by default), one DELETE per CHUNK_SIZE users;
+    returns the number of entries dropped"""
+    if user_ids is None:
+        return _trim(None)
+    user_ids = list(user_ids)
+    return sum(
+        _trim(user_ids[start:start + CHUNK_SIZE])
+        for start in range(0, len(user_ids), CHUNK_SIZE))
+
+
+def enabled():
+    """whether new posts and follows have to reach the timelines"""
+    return settings.FOLLOW_FEED_ENGINE == 'timeline'
+
+
+def fan_out(post):
+    """push a new post into the timelines of the author's followers;
+    they grow past TIMELINE_LENGTH until the trim_timelines command runs,
+    trimming here would cost a statement per post and follower"""
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in follower_ids),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, *author_ids):
+    """copy the recent posts of newly followed authors into the timeline"""
+    posts = (
+        Post.objects.filter(author_id__in=author_ids)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'pub_date')[:TIMELINE_LENGTH]
+    )
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def remove(user_id, *author_ids):
+    """take the posts of unfollowed authors out of the user's timeline"""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id__in=author_ids).delete()
+
+
+def rebuild(user_id):
+    """recompute one user's timeline from Follow and Post"""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    posts = (
+        Post.objects.filter(author__following__user_id=user_id)
+        .order_by('-pub_date', '-id')
+        .values_list('id', 'pub_date')[:TIMELINE_LENGTH]
+    )
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def paginator(user_id, per_page):
+    return CursorPaginator(TimelineEntry.objects.filter(user_id=user_id), per_page)
+
+
+def posts_for(entries):
+    """the feed-ready posts behind a page of timeline entries, in order"""
+    post_ids = [entry.post_id for entry in entries]
+    posts = Post.objects.for_feed().in_bulk(post_ids)
+    return [posts[post_id] for post_id in post_ids if post_id in posts]
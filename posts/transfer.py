@@ -0,0 +1,272 @@
+"""Streaming JSONL export and import of users, groups, posts, comments
+and follows (export_yatube / import_yatube).
+
+Every line is one object with a "type" and the row's fields, foreign keys
+as ids of the exporting database. Types come in dependency order, so the
+import is a single pass over the file.
+
+The import never keeps the whole id mapping in memory: imported rows get
+explicit ids shifted past the current maximum of their table, so every
+reference is remapped by adding an offset. Only users and groups that
+already exist (same username / slug) are reused, and only those few are
+remembered. Signals do not run for bulk_create, the search triggers are
+dropped for the import, and the derived data (counters, timelines,
+search index, caches) is rebuilt once at the end.
+
+The rows go in as one transaction: a malformed line or a failing batch
+leaves the database as it was, and the file can be imported again once
+it is fixed. The price is the write lock, held for the whole import.
+"""
+import contextlib
+import io
+import json
+import time
+
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils.dateparse import parse_datetime
+
+from . import follow_graph, generations, pull_feed, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+FORMAT = 'yatube-jsonl'
+VERSION = 1
+
+# (type, model, exported fields, datetime fields)
+TYPES = (
+    ('user', User, ('id', 'username', 'password', 'email', 'first_name',
+                    'last_name', 'is_active', 'date_joined', 'last_login'),
+     ('date_joined', 'last_login')),
+    ('group', Group, ('id', 'title', 'slug', 'description'), ()),
+    ('post', Post, ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image'),
+     ('pub_date',)),
+    ('comment', Comment, ('id', 'post_id', 'author_id', 'text', 'created'),
+     ('created',)),
+    ('follow', Follow, ('id', 'user_id', 'author_id'), ()),
+)
+MODELS = {name: model for name, model, *_ in TYPES}
+FIELDS = {name: frozenset(fields) for name, _, fields, _ in TYPES}
+
+
+def _default(value):
+    # datetimes, the only non-JSON values in the exported fields
+    return value.isoformat()
+
+
+def export_lines(chunk_size=2000):
+    """(type, JSONL line) of the whole database, read `chunk_size` rows
+    at a time"""
+    yield 'header', json.dumps(
+        {'type': 'header', 'format': FORMAT, 'version': VERSION})
+    for name, model, fields, _ in TYPES:
+        rows = model.objects.order_by('pk').values(*fields)
+        for row in rows.iterator(chunk_size=chunk_size):
+            row['type'] = name
+            yield name, json.dumps(row, default=_default, ensure_ascii=False)
+
+
+class Throughput:
+    """rows per type and per second"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.rows = {}
+
+    def add(self, name, count=1):
+        self.rows[name] = self.rows.get(name, 0) + count
+
+    @property
+    def total(self):
+        return sum(self.rows.values())
+
+    def rate(self):
+        return self.total / max(time.monotonic() - self.started, 1e-9)
+
+    def summary(self):
+        parts = ', '.join('%s %s' % (count, name) for name, count in self.rows.items())
+        return '%s rows (%s) at %.0f rows/s' % (self.total, parts or 'none', self.rate())
+
+
+@contextlib.contextmanager
+def keep_dates(*fields):
+    """bulk_create without auto_now_add overwriting the imported dates"""
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, saved):
+            field.auto_now_add = value
+
+
+@contextlib.contextmanager
+def search_triggers_off():
+    """one FTS rebuild at the end is far cheaper than a trigger per row"""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for name in search.TRIGGERS:
+                cursor.execute('DROP TRIGGER IF EXISTS %s' % name)
+    try:
+        yield
+    finally:
+        # recreates the triggers and reindexes every post
+        search.ensure_index()
+
+
+class Importer:
+    def __init__(self, batch_size=2000, stdout=None):
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.throughput = Throughput()
+        self.offsets = {
+            name: model.objects.aggregate(last=Max('pk'))['last'] or 0
+            for name, model in MODELS.items()
+        }
+        # old id -> id of an existing row, only for reused users and groups
+        self.reused = {'user': {}, 'group': {}}
+        self.batch = []
+        self.batch_type = None
+
+    def new_id(self, name, old_id):
+        if old_id is None:
+            return None
+        reused = self.reused.get(name, {}).get(old_id)
+        if reused is not None:
+            return reused
+        return old_id + self.offsets[name]
+
+    def run(self, lines):
+        """import every row of `lines` or, on any error, none of them;
+        malformed lines raise ValueError"""
+        with transaction.atomic(), keep_dates(
+                Post._meta.get_field('pub_date'),
+                Comment._meta.get_field('created')):
+            for number, line in enumerate(lines, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                if not isinstance(row, dict) or 'type' not in row:
+                    raise ValueError('line %s: not an object with a "type"' % number)
+                name = row.pop('type')
+                if name == 'header':
+                    if row.get('format') != FORMAT or row.get('version') != VERSION:
+                        raise ValueError('line %s: not a %s v%s file' % (
+                            number, FORMAT, VERSION))
+                    continue
+                if name not in MODELS:
+                    raise ValueError('line %s: unknown type %r' % (number, name))
+                if row.keys() != FIELDS[name]:
+                    raise ValueError('line %s: a %s needs the fields %s' % (
+                        number, name, ', '.join(sorted(FIELDS[name]))))
+                if name != self.batch_type:
+                    self.flush()
+                    self.batch_type = name
+                self.batch.append(row)
+                if len(self.batch) >= self.batch_size:
+                    self.flush()
+            self.flush()
+            self.reset_sequences()
+
+    def flush(self):
+        if not self.batch:
+            return
+        name, rows = self.batch_type, self.batch
+        self.batch = []
+        dates = next(dates for n, _, _, dates in TYPES if n == name)
+        for row in rows:
+            for field in dates:
+                if row.get(field):
+                    row[field] = parse_datetime(row[field])
+        getattr(self, 'create_%ss' % name)(rows)
+        self.throughput.add(name, len(rows))
+        if self.stdout is not None:
+            self.stdout.write('\r%s rows, %.0f rows/s' % (
+                self.throughput.total, self.throughput.rate()), ending='')
+            self.stdout.flush()
+
+    def reuse_existing(self, name, model, rows, field):
+        """map rows whose `field` already exists onto the existing rows,
+        returns the rows still to be created"""
+        existing = dict(model.objects.filter(
+            **{field + '__in': [row[field] for row in rows]}
+        ).values_list(field, 'pk'))
+        for row in rows:
+            if row[field] in existing:
+                self.reused[name][row['id']] = existing[row[field]]
+        return [row for row in rows if row[field] not in existing]
+
+    def create_users(self, rows):
+        rows = self.reuse_existing('user', User, rows, 'username')
+        User.objects.bulk_create(
+            User(**dict(row, id=self.new_id('user', row['id']))) for row in rows)
+
+    def create_groups(self, rows):
+        rows = self.reuse_existing('group', Group, rows, 'slug')
+        Group.objects.bulk_create(
+            Group(**dict(row, id=self.new_id('group', row['id']))) for row in rows)
+
+    def create_posts(self, rows):
+        posts = [Post(**dict(
+            row,
+            id=self.new_id('post', row['id']),
+            author_id=self.new_id('user', row['author_id']),
+            group_id=self.new_id('group', row['group_id']),
+        )) for row in rows]
+        for post in posts:
+            # bulk_create does not call save()
+            post.render_text()
+        Post.objects.bulk_create(posts)
+
+    def create_comments(self, rows):
+        Comment.objects.bulk_create(Comment(**dict(
+            row,
+            id=self.new_id('comment', row['id']),
+            post_id=self.new_id('post', row['post_id']),
+            author_id=self.new_id('user', row['author_id']),
+        )) for row in rows)
+
+    def create_follows(self, rows):
+        # a reused user may already follow a reused author
+        Follow.objects.bulk_create((Follow(**dict(
+            row,
+            id=self.new_id('follow', row['id']),
+            user_id=self.new_id('user', row['user_id']),
+            author_id=self.new_id('user', row['author_id']),
+        )) for row in rows), ignore_conflicts=True)
+
+    def reset_sequences(self):
+        # explicit ids do not advance the sequences of every backend
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), list(MODELS.values()))
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def rebuild_derived(self):
+        """counters, timelines of the importing followers and feed caches"""
+        call_command('reconcile_counters', stdout=io.StringIO())
+        # new follows, and old followers of reused authors with new posts
+        followers = (
+            Follow.objects.filter(
+                Q(pk__gt=self.offsets['follow'])
+                | Q(author_id__in=list(self.reused['user'].values()))
+            )
+            .order_by('user_id').values_list('user_id', flat=True).distinct()
+        )
+        followers = list(followers)
+        if timeline.enabled():
+            for user_id in followers:
+                with transaction.atomic():
+                    timeline.rebuild(user_id)
+        # bulk_create sent no Follow or Post signals
+        follow_graph.forget(followers)
+        pull_feed.forget(self.reused['user'].values())
+        scopes = ['posts']
+        scopes += ['group:%s' % pk for pk in self.reused['group'].values()]
+        for pk in self.reused['user'].values():
+            scopes += ['author:%s' % pk, 'profile:%s' % pk, 'timeline:%s' % pk]
+        generations.bump(*scopes)
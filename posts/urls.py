@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.index, name="index"),
@@ -9,12 +9,23 @@ urlpatterns = [
     path("new/", views.new_post, name="new_post"),
 
     path("follow/", views.follow_index, name="follow_index"),
+    path("follow/bulk/", views.follow_bulk, name="follow_bulk"),
+    path("search/", views.search, name="search"),
+
+    # JSON API, те же ленты без HTML
+    path("api/posts/", api.index, name="api_index"),
+    path("api/group/<str:slug>/", api.group_posts, name="api_group"),
+    path("api/<str:username>/", api.profile, name="api_profile"),
+    path("api/<str:username>/<int:post_id>/", api.post_view, name="api_post"),
+
     path("<str:username>/follow/", views.profile_follow, name="profile_follow"),
     path("<str:username>/unfollow/", views.profile_unfollow, name="profile_unfollow"),
 
     path('<str:username>/', views.profile, name='profile'),
+    path('<str:username>/archive/', views.profile_archive, name='profile_archive'),
 
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
+    path('<str:username>/<int:post_id>/comments/', views.post_comments, name='post_comments'),
     path(
         '<str:username>/<int:post_id>/edit/',
         views.post_edit,
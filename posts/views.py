@@ -1,53 +1,112 @@
+import json
+
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from .models import Post, Group, User, Comment, Follow
+from . import (
+    api, archive, counters, follow_graph, follows, generations, images, pull_feed,
+    timeline)
+from .conditional import author_scopes, conditional_feed, group_scopes, index_scopes
 from .forms import PostForm, CommentForm
+from .instrumentation import query_budget
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.views.decorators.http import require_POST
+from .paginator import (
+    COMMENTS_PER_PAGE, POSTS_PER_PAGE, CursorPaginator, legacy_page_redirect)
+from .search import MAX_RESULTS, search_posts
 from django.core.paginator import Paginator
 
 from django.views.decorators.cache import cache_page
 from django.core.cache import cache
 
+FOLLOW_FEED_ENGINES = {'timeline': timeline, 'pull': pull_feed}
+
+
 #@cache_page(20, key_prefix='index_page')
+@query_budget(3)
+@conditional_feed(index_scopes)
 def index(request):
-    latest = Post.objects.order_by('-pub_date').all()
-    paginator = Paginator(latest, 10)  # показывать по 10 записей на странице.
-    page_number = request.GET.get('page')  # переменная в URL с номером запрошенной страницы
-    page = paginator.get_page(page_number)  # получить записи с нужным смещением
+    latest = Post.objects.for_feed()
+    paginator = CursorPaginator(latest, POSTS_PER_PAGE)
+    # старые ссылки вида ?page=N переадресуем на курсор
+    legacy = legacy_page_redirect(request, paginator)
+    if legacy:
+        return legacy
+    page = paginator.get_page(request)  # записи после/до курсора ?after=/?before=
     return render(
         request,
         'index.html',
-        {'posts': latest, 'page': page, 'paginator': paginator}
+        {
+            'posts': latest,
+            'page': page,
+            'paginator': paginator,
+            'cache_key': generations.fragment_key(request, page, 'posts'),
+        }
     )
 
 
+@query_budget(4)
+def search(request):
+    """posts matching ?q= from the FTS5 index, best match first"""
+    query = request.GET.get('q', '').strip()
+    results = search_posts(Post.objects.for_feed(), query)[:MAX_RESULTS]
+    # по релевантности курсор не построить, выдача ограничена MAX_RESULTS
+    paginator = Paginator(results, POSTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    return render(request, 'search.html', {
+        'query': query,
+        'page': page,
+        'paginator': paginator,
+    })
+
+
+@query_budget(5)
+@conditional_feed(group_scopes)
 def group_posts(request, slug):
     """view function for community page"""
     group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.filter(group=group).order_by("-pub_date").all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = Post.objects.for_feed().filter(group=group)
+    paginator = CursorPaginator(posts, POSTS_PER_PAGE)
+    legacy = legacy_page_redirect(request, paginator)
+    if legacy:
+        return legacy
+    page = paginator.get_page(request)
     return render(
         request,
         "group.html",
-        {"group": group, "page": page, "paginator": paginator}
+        {
+            "group": group,
+            "page": page,
+            "paginator": paginator,
+            "cache_key": generations.fragment_key(
+                request, page, "group:%s" % group.pk),
+        }
     )
 
 
 # close pages from unauthorized users
+@query_budget(9)
 @login_required
+@transaction.atomic
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         form = form.save(commit=False)
         form.author = request.user
+        form.image_pending = bool(form.image)
         form.save()
+        if form.image_pending:
+            images.enqueue(form)
         return redirect('/')
     return render(request, 'new_post.html', {'form': form})
 
 
 # close pages from unauthorized users
+@query_budget(12)
 @login_required
+@transaction.atomic
 def post_edit(request, username, post_id):
     profile = get_object_or_404(User, username=username)
     post = get_object_or_404(Post, id=post_id)
@@ -60,7 +119,11 @@ def post_edit(request, username, post_id):
         edit_post.author = post.author
         edit_post.id = post.id
         edit_post.pub_date = post.pub_date
+        if 'image' in form.changed_data:
+            edit_post.image_pending = bool(edit_post.image)
         edit_post.save()
+        if 'image' in form.changed_data and edit_post.image_pending:
+            images.enqueue(edit_post)
         return redirect("post", username=post.author, post_id=post_id)
 
 
@@ -73,17 +136,18 @@ def post_edit(request, username, post_id):
     return render(request, "new_post.html", context)
 
 
+@query_budget(6)
+@conditional_feed(author_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts_count = Post.objects.filter(author=author).count()
-    author_posts = Post.objects.filter(author=author).order_by('-pub_date')
-    paginator = Paginator(author_posts, 10)
-    page = paginator.get_page(request.GET.get('page'))
-    following = False
-    if request.user.is_authenticated:
-        author_value = User.objects.get(username=username)
-        user_value = User.objects.get(username=request.user)
-        following = Follow.objects.filter(author=author_value, user=user_value)
+    author = get_object_or_404(User.objects.select_related('stats'), username=username)
+    posts_count = counters.stats_for(author).posts_count
+    author_posts = Post.objects.for_feed().filter(author=author).order_by('-pub_date')
+    paginator = CursorPaginator(author_posts, POSTS_PER_PAGE)
+    legacy = legacy_page_redirect(request, paginator)
+    if legacy:
+        return legacy
+    page = paginator.get_page(request)
+    following = follow_graph.is_following(request.user, author)
 
     return render(request, 'profile.html', {
         'page': page,
@@ -92,25 +156,63 @@ def profile(request, username):
         'author': author,
         'author_posts': author_posts,
         'following': following,
+        'cache_key': generations.fragment_key(
+            request, page, 'author:%s' % author.pk),
     })
 
 
+def comments_page(request, post_id):
+    """the post's comments and one cursor page of them, newest first"""
+    comments = Comment.objects.filter(post_id=post_id).select_related('author')
+    paginator = CursorPaginator(comments, COMMENTS_PER_PAGE, date_field='created')
+    return comments, paginator.get_page(request)
+
+
 #edit for comments
+@query_budget(7)
+@conditional_feed(author_scopes)
 def post_view(request, username, post_id):
-    author = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, author=author.id, id=post_id)
-    posts_count = Post.objects.filter(author=post.author).count()
-    items = post.comments.order_by('-created').all()
+    author = get_object_or_404(User.objects.select_related('stats'), username=username)
+    post = get_object_or_404(Post.objects.for_feed(), author=author.id, id=post_id)
+    posts_count = counters.stats_for(author).posts_count
+    # не больше COMMENTS_PER_PAGE комментариев, остальные по кнопке
+    comments, items = comments_page(request, post_id)
     return render(request, 'post.html', {
         'posts_count': posts_count,
         'post': post,
         'author': author,
         # for comment
+        'comments': comments,
         'items': items,
+        'username': username,
+        'post_id': post_id,
         'form': CommentForm(),
     })
 
 
+@query_budget(5)
+@conditional_feed(author_scopes)
+def post_comments(request, username, post_id):
+    """"load more" for post_view: the next page of comments as an HTML
+    fragment, or as JSON with ?format=json"""
+    if not Post.objects.filter(id=post_id, author__username=username).exists():
+        raise Http404
+    if request.GET.get('format') == 'json':
+        rows = Comment.objects.filter(post_id=post_id).values(*api.COMMENT_FIELDS)
+        page = CursorPaginator(rows, COMMENTS_PER_PAGE, date_field='created') \
+            .get_page(request)
+        return api.json_response(dict(
+            comments=api.serialize_comments(page.object_list),
+            **api.page_links(request, page)
+        ))
+    comments, items = comments_page(request, post_id)
+    return render(request, 'includes/comments_list.html', {
+        'items': items,
+        'username': username,
+        'post_id': post_id,
+    })
+
+
 def page_not_found(request, exception):
     # The exception variable contains debug information,
     # we will not display it in the custom 404 page template
@@ -126,7 +228,31 @@ def server_error(request):
     return render(request, "misc/500.html", status=500)
 
 
+# the archive itself is read while the response streams, past the budget
+@query_budget(2)
 @login_required
+def profile_archive(request, username):
+    """the author's own posts, comments and images as a streamed download"""
+    if username != request.user.username:
+        return redirect('profile', username=username)
+    fmt = request.GET.get('format', 'zip')
+    if fmt == 'ndjson':
+        response = StreamingHttpResponse(
+            archive.ndjson_stream(request.user),
+            content_type='application/x-ndjson; charset=utf-8')
+        filename = '%s.ndjson' % username
+    else:
+        response = StreamingHttpResponse(
+            archive.zip_stream(request.user, Post._meta.get_field('image').storage),
+            content_type='application/zip')
+        filename = '%s.zip' % username
+    response['Content-Disposition'] = 'attachment; filename="yatube-%s"' % filename
+    return response
+
+
+@query_budget(7)
+@login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, author__username=username, id=post_id)
     form = CommentForm(request.POST or None)
@@ -140,17 +266,32 @@ def add_comment(request, username, post_id):
 
 
 # close pages from unauthorized users
+@query_budget(4)
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'follow.html', {'page': page, 'paginator': paginator})
+    # лента без JOIN с Follow: заранее собранный timeline или слияние
+    # последних постов авторов (settings.FOLLOW_FEED_ENGINE)
+    engine = FOLLOW_FEED_ENGINES[settings.FOLLOW_FEED_ENGINE]
+    paginator = engine.paginator(request.user.pk, POSTS_PER_PAGE)
+    legacy = legacy_page_redirect(request, paginator)
+    if legacy:
+        return legacy
+    page = paginator.get_page(request)
+    page.object_list = engine.posts_for(page.object_list)
+    # страница меняется и при подписке, и при изменении постов авторов на ней
+    scopes = ['timeline:%s' % request.user.pk]
+    scopes += sorted({'author:%s' % post.author_id for post in page})
+    return render(request, 'follow.html', {
+        'page': page,
+        'paginator': paginator,
+        'cache_key': generations.fragment_key(request, page, *scopes),
+    })
 
 
 # close pages from unauthorized users
+@query_budget(13)
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -159,8 +300,40 @@ def profile_follow(request, username):
 
 
 # close pages from unauthorized users
+@query_budget(9)
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
-    unfollow_profile = Follow.objects.get(author__username=username, user=request.user)
-    unfollow_profile.delete()
+    Follow.objects.filter(author__username=username, user=request.user).delete()
     return redirect('profile', username=username)
+
+
+def usernames_of(data, name):
+    usernames = data.get(name, [])
+    if not isinstance(usernames, list) or not all(
+            isinstance(username, str) for username in usernames):
+        raise ValueError('"%s" must be a list of usernames' % name)
+    return usernames
+
+
+# импорт списка подписок: {"follow": [...], "unfollow": [...]} одним запросом
+@query_budget(20)
+@login_required
+@require_POST
+@transaction.atomic
+def follow_bulk(request):
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError('expected a JSON object')
+        to_follow = usernames_of(data, 'follow')
+        to_unfollow = usernames_of(data, 'unfollow')
+    except ValueError as error:
+        return api.json_response({'error': str(error)}, status=400)
+    if len(to_follow) + len(to_unfollow) > follows.MAX_USERNAMES:
+        return api.json_response(
+            {'error': 'at most %s usernames' % follows.MAX_USERNAMES}, status=400)
+    return api.json_response({
+        'follow': follows.follow_many(request.user, to_follow),
+        'unfollow': follows.unfollow_many(request.user, to_unfollow),
+    })
@@ -0,0 +1,150 @@
+"""Warm start of a web process: settings.WARM_START, run from yatube/wsgi.py.
+
+The first requests after a deploy used to parse every template and find
+every cache empty. With WARM_START the settings put the cached template
+loader in front of the others (even with DEBUG), and warm_start() then
+compiles every template of the project templates/ directory and renders
+the first page of the index and of the WARM_START_GROUPS biggest groups
+as an anonymous visitor. That fills the response, card, generation and
+thumbnail caches the way the first visitors would have. With the shared
+SQLite cache the warm_start command does the same once per deploy for
+all the workers.
+
+The report goes to the posts.startup logger: time of each step, the
+templates that failed to compile, the status of every primed page and
+the packages imported since the process started.
+"""
+import collections
+import logging
+import os
+import sys
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+from django.urls import reverse
+
+from .models import Group
+
+logger = logging.getLogger('posts.startup')
+
+# packages listed in the import report
+TOP_PACKAGES = 8
+
+
+def template_names(engine):
+    """names of the templates in the DIRS of a DjangoTemplates engine;
+    app directories are left out, they hold the admin's hundreds"""
+    for directory in engine.engine.dirs:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.relpath(os.path.join(root, name), directory)
+                yield path.replace(os.sep, '/')
+
+
+def compile_templates():
+    """(number compiled, names that failed); with the cached loader the
+    compiled templates are kept for the life of the process"""
+    compiled, failed = 0, []
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for name in sorted(template_names(engine)):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                failed.append(name)
+            else:
+                compiled += 1
+    return compiled, failed
+
+
+def feed_urls(groups):
+    """the index and the `groups` groups with the most posts"""
+    slugs = (
+        Group.objects.exclude(slug=None)
+        .annotate(posts_count=Count('posts'))
+        .order_by('-posts_count', 'pk')
+        .values_list('slug', flat=True)[:groups]
+    )
+    # reverse('index') is /group/, the other pattern of that name
+    return ['/'] + [reverse('group', args=[slug]) for slug in slugs]
+
+
+def _host():
+    # a request for a host outside ALLOWED_HOSTS would only get a 400
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+def prime(application, urls):
+    """{url: status} of anonymous GETs through the full middleware stack"""
+    factory = RequestFactory(HTTP_HOST=_host())
+    return {
+        url: application.get_response(factory.get(url)).status_code
+        for url in urls
+    }
+
+
+def imported_since(modules):
+    """(number of modules imported since `modules`, the top packages)"""
+    imported = set(sys.modules) - modules
+    packages = collections.Counter(name.partition('.')[0] for name in imported)
+    return len(imported), packages.most_common(TOP_PACKAGES)
+
+
+def warm_start(application, started=None, modules=None):
+    """compile the templates and prime the caches, then log a report;
+    `started` (perf_counter) and `modules` (a set of sys.modules) are
+    taken when the process started importing, see yatube/wsgi.py.
+    Errors are logged and leave the process cold, the report is None"""
+    begun = time.perf_counter()
+    steps = []
+    if started is not None:
+        steps.append(('setup', (begun - started) * 1000))
+
+    def step(label, func, *args):
+        step_started = time.perf_counter()
+        result = func(*args)
+        steps.append((label, (time.perf_counter() - step_started) * 1000))
+        return result
+
+    try:
+        compiled, failed = step('templates', compile_templates)
+        pages = step('pages', prime, application, feed_urls(settings.WARM_START_GROUPS))
+    except Exception:
+        # runs at import of the WSGI module: a cold process beats none
+        logger.exception('warm start failed, starting cold')
+        return None
+    finally:
+        # a forking server must not hand these to its workers
+        connections.close_all()
+
+    total = time.perf_counter() - (begun if started is None else started)
+    report = {
+        'total_ms': round(total * 1000, 1),
+        'steps': {label: round(ms, 1) for label, ms in steps},
+        'templates': compiled,
+        'failed': failed,
+        'pages': pages,
+    }
+    if modules is not None:
+        report['modules'], report['packages'] = imported_since(modules)
+
+    logger.info('warm start in %.0f ms: %s', report['total_ms'], ', '.join(
+        '%s %.0f ms' % (label, ms) for label, ms in report['steps'].items()))
+    logger.info('compiled %s templates', compiled)
+    if failed:
+        logger.warning('templates that do not compile: %s', ', '.join(failed))
+    logger.info('primed %s', ', '.join(
+        '%s %s' % (url, status) for url, status in pages.items()))
+    if modules is not None:
+        logger.info('imported %s modules: %s', report['modules'], ', '.join(
+            '%s %s' % pair for pair in report['packages']))
+    return report
@@ -1,5 +1,16 @@
 import pytest
 import tempfile
+from io import BytesIO
+
+from PIL import Image
+from django.core.files.base import ContentFile
+
+
+def image_file(name):
+    """PNG 50x50 для ImageField, не fixture: имя задаёт тест"""
+    file_obj = BytesIO()
+    Image.new('RGB', size=(50, 50), color=(255, 0, 0)).save(file_obj, 'png')
+    return ContentFile(file_obj.getvalue(), name=name)
 
 
 @pytest.fixture
@@ -20,3 +31,19 @@ def post_with_group(user, group):
     from posts.models import Post
     image = tempfile.NamedTemporaryFile(suffix=".jpg").name
     return Post.objects.create(text='Тестовый пост 2', author=user, group=group, image=image)
+
+
+@pytest.fixture
+def feed(user, group):
+    """автор с 10 постами по 3 комментария, на которого подписан user"""
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from posts.models import Comment, Follow, Post
+    author = get_user_model().objects.create_user(username='FeedAuthor')
+    Follow.objects.create(user=user, author=author)
+    for i in range(10):
+        post = Post.objects.create(text=f'Тестовый пост {i}', author=author, group=group)
+        for j in range(3):
+            Comment.objects.create(text=f'Комментарий {j}', author=user, post=post)
+    cache.clear()
+    return author
@@ -0,0 +1,12 @@
+import importlib
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def production(monkeypatch):
+    """yatube.settings_production, imported afresh with a SECRET_KEY set"""
+    monkeypatch.setenv('SECRET_KEY', 'test-secret-key')
+    monkeypatch.delitem(sys.modules, 'yatube.settings_production', raising=False)
+    return importlib.import_module('yatube.settings_production')
@@ -0,0 +1,104 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.checks import run_checks
+from django.core.cache import cache
+from django.test import Client
+from django.urls import URLPattern, get_resolver, resolve
+
+from posts.instrumentation import assert_within_budget
+from posts.models import Comment, Post
+from tests.fixtures.fixture_data import image_file
+from users.forms import RESERVED_USERNAMES
+
+
+def get_json(client, url, **headers):
+    response = client.get(url, **headers)
+    assert response.status_code == 200, f'Страница `{url}` работает неправильно'
+    assert response['Content-Type'] == 'application/json'
+    assert_within_budget(response)
+    return response
+
+
+class TestApi:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feeds(self, client, feed, group):
+        for url in ('/api/posts/', f'/api/group/{group.slug}/', f'/api/{feed.username}/'):
+            data = get_json(client, url).json()
+            assert len(data['results']) == 10, f'Проверьте, что `{url}` отдаёт страницу постов'
+            assert data['results'][0]['author'] == feed.username
+            assert data['results'][0]['comments_count'] == 3
+        assert get_json(client, f'/api/{feed.username}/').json()['author']['posts_count'] == 10
+        assert Client().get('/api/group/missing/').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cursor_pagination(self, client, user):
+        for i in range(15):
+            Post.objects.create(text=f'Пост {i}', author=user)
+        first = get_json(client, '/api/posts/').json()
+        assert first['previous'] is None and first['next']
+        second = get_json(client, first['next']).json()
+        assert [p['text'] for p in first['results'] + second['results']] == \
+            [f'Пост {i}' for i in reversed(range(15))]
+        assert second['next'] is None and second['previous']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_detail_and_thumbnails(self, client, user):
+        post = Post.objects.create(text='С картинкой', author=user, image=image_file('api.png'))
+        Post.objects.create(text='Без картинки', author=user)
+        for i in range(3):
+            Comment.objects.create(text=f'Комментарий {i}', author=user, post=post)
+        cache.clear()
+
+        data = get_json(client, f'/api/{user.username}/{post.pk}/').json()
+        assert data['post']['text'] == 'С картинкой'
+        assert data['post']['thumbnail'].startswith('/media/cache/'), \
+            'Проверьте, что в API отдаётся адрес миниатюры'
+        assert [c['text'] for c in data['comments']] == [f'Комментарий {i}' for i in (2, 1, 0)]
+        feed = get_json(client, '/api/posts/').json()['results']
+        assert [p['thumbnail'] is None for p in feed] == [True, False]
+        assert Client().get(f'/api/{user.username}/{post.pk + 100}/').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_etag(self, client, feed):
+        response = get_json(client, '/api/posts/')
+        assert response.has_header('ETag')
+        cached = client.get('/api/posts/', HTTP_IF_NONE_MATCH=response['ETag'])
+        assert cached.status_code == 304, 'Проверьте, что API поддерживает ETag'
+        Post.objects.create(text='Новый', author=feed)
+        assert client.get('/api/posts/', HTTP_IF_NONE_MATCH=response['ETag']).status_code == 200
+
+    def test_usernames_do_not_shadow_routes(self):
+        # первые сегменты всех адресов, include('') раскрывается
+        prefixes = set()
+        patterns = list(get_resolver().url_patterns)
+        while patterns:
+            pattern = patterns.pop()
+            route = str(pattern.pattern).lstrip('^')
+            if not route and not isinstance(pattern, URLPattern):
+                patterns.extend(pattern.url_patterns)
+            elif not route.startswith('<'):
+                prefixes.add(route.split('/')[0])
+        prefixes.discard('')
+        assert prefixes <= RESERVED_USERNAMES, \
+            'Проверьте, что первые сегменты адресов нельзя занять именем пользователя'
+        assert resolve('/api/follow/').url_name == 'api_profile'
+        assert resolve('/search/').url_name == 'search'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_signup_rejects_reserved_usernames(self, client):
+        for username in ('api', 'Search', 'follow', 'reader'):
+            client.post('/auth/signup/', {
+                'username': username,
+                'password1': 'Zx8-long-password', 'password2': 'Zx8-long-password',
+            })
+        assert list(get_user_model().objects.values_list('username', flat=True)) == ['reader'], \
+            'Проверьте, что при регистрации нельзя занять имя из адресов сайта'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_existing_reserved_usernames_reported(self, user):
+        assert not [w for w in run_checks(tags=['database']) if w.id == 'users.W001']
+        get_user_model().objects.create_user(username='search')
+        warnings = [w for w in run_checks(tags=['database']) if w.id == 'users.W001']
+        assert [w.obj for w in warnings] == ['search'], \
+            'Проверьте, что check сообщает о пользователях с занятыми именами'
@@ -0,0 +1,51 @@
+import json
+import zipfile
+from io import BytesIO
+
+import pytest
+from django.test import Client
+
+from posts.models import Comment, Post
+from tests.fixtures.fixture_data import image_file
+
+
+def download(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, f'Страница `{url}` работает неправильно'
+    assert response.streaming, 'Проверьте, что архив отдаётся потоком'
+    return b''.join(response.streaming_content)
+
+
+class TestArchive:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_zip_archive(self, user_client, user, post):
+        Post.objects.create(text='Пост с картинкой', author=user, image=image_file('archive.png'))
+        Comment.objects.create(text='Комментарий к посту', author=user, post=post)
+
+        archive = zipfile.ZipFile(BytesIO(download(user_client, f'/{user.username}/archive/')))
+        names = archive.namelist()
+        assert 'posts.ndjson' in names and 'comments.ndjson' in names
+        posts = [json.loads(line) for line in archive.read('posts.ndjson').splitlines()]
+        assert [p['text'] for p in posts] == ['Тестовый пост 1', 'Пост с картинкой']
+        comments = archive.read('comments.ndjson').decode()
+        assert 'Комментарий к посту' in comments
+        images = [name for name in names if name.startswith('images/')]
+        assert len(images) == 1, 'Проверьте, что в архив попадают файлы картинок'
+        assert archive.read(images[0])[:4] == b'\x89PNG'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_ndjson_archive(self, user_client, user, post):
+        Comment.objects.create(text='Комментарий', author=user, post=post)
+        lines = download(user_client, f'/{user.username}/archive/?format=ndjson').splitlines()
+        rows = [json.loads(line) for line in lines]
+        assert [row['type'] for row in rows] == ['post', 'comment']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_only_own_archive(self, user_client, post):
+        response = Client().get(f'/{post.author.username}/archive/')
+        assert response.status_code == 302 and '/auth/login/' in response.url, \
+            'Проверьте, что архив доступен только авторизованным пользователям'
+        response = user_client.get('/someone/archive/')
+        assert response.status_code == 302 and response.url == '/someone/', \
+            'Проверьте, что скачать можно только свой архив'
@@ -0,0 +1,34 @@
+import json
+import os
+
+import pytest
+
+from posts.bench import regressions, run_views, seed_site, view_scenarios
+
+# opt-in: YATUBE_BENCH=1 pytest tests/test_benchmarks.py
+#   YATUBE_BENCH_POSTS     dataset size (2000)
+#   YATUBE_BENCH_OUTPUT    save the results as JSON
+#   YATUBE_BENCH_BASELINE  fail on regressions against an earlier JSON
+pytestmark = pytest.mark.skipif(
+    not os.environ.get('YATUBE_BENCH'), reason='set YATUBE_BENCH=1 to run benchmarks')
+
+
+class TestViewBenchmarks:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_views_benchmark(self):
+        dataset = seed_site(int(os.environ.get('YATUBE_BENCH_POSTS', 2000)))
+        results = run_views(view_scenarios(*dataset), dataset[0], repeat=10)
+
+        for name, row in results.items():
+            print('%-18s %s' % (name, row))
+            assert row['status'] < 400, f'Страница `{name}` работает неправильно'
+
+        if os.environ.get('YATUBE_BENCH_OUTPUT'):
+            with open(os.environ['YATUBE_BENCH_OUTPUT'], 'w') as f:
+                json.dump({'views': results}, f, indent=2)
+        if os.environ.get('YATUBE_BENCH_BASELINE'):
+            with open(os.environ['YATUBE_BENCH_BASELINE']) as f:
+                baseline = json.load(f)['views']
+            found = regressions(results, baseline)
+            assert not found, f'Производительность ухудшилась: {found}'
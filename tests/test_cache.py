@@ -0,0 +1,65 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from posts.models import Comment, Follow, Post
+
+
+@pytest.fixture
+def feed_urls(user, group):
+    author = get_user_model().objects.create_user(username='CacheAuthor')
+    Follow.objects.create(user=user, author=author)
+    Post.objects.create(text='Первый пост', author=author, group=group)
+    cache.clear()
+    return author, ('/', f'/group/{group.slug}/', f'/{author.username}/', '/follow/')
+
+
+class TestFeedCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_unchanged_pages_are_cache_hits(self, user_client, feed_urls):
+        author, urls = feed_urls
+        for url in urls:
+            user_client.get(url)
+        # bypasses signals, so cached fragments must still be served
+        Post.objects.filter(author=author).update(text='Изменён в обход сигналов')
+        for url in urls:
+            response = user_client.get(url)
+            assert 'Первый пост' in response.content.decode(), \
+                f'Проверьте, что неизменённая страница `{url}` берётся из кэша'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_new_post_is_shown_immediately(self, user_client, feed_urls, group):
+        author, urls = feed_urls
+        for url in urls:
+            user_client.get(url)
+        Post.objects.create(text='Свежий пост', author=author, group=group)
+        for url in urls:
+            response = user_client.get(url)
+            assert 'Свежий пост' in response.content.decode(), \
+                f'Проверьте, что новый пост сразу появляется на странице `{url}`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_new_comment_is_shown_immediately(self, user, user_client, feed_urls):
+        author, urls = feed_urls
+        card_urls = [url for url in urls if 'group' not in url]
+        for url in card_urls:
+            user_client.get(url)
+        Comment.objects.create(text='Комментарий', author=user, post=Post.objects.get(author=author))
+        for url in card_urls:
+            response = user_client.get(url)
+            assert '1 комментариев' in response.content.decode(), \
+                f'Проверьте, что новый комментарий сразу учитывается на странице `{url}`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pages_do_not_share_fragments(self, user_client, feed_urls, group):
+        author, urls = feed_urls
+        for i in range(15):
+            Post.objects.create(text=f'Пост номер {i}', author=author, group=group)
+        first = user_client.get('/')
+        second = user_client.get('/', {'after': first.context['page'].next_cursor})
+        assert 'Первый пост' not in first.content.decode()
+        assert 'Первый пост' in second.content.decode(), \
+            'Проверьте, что разные страницы ленты кэшируются под разными ключами'
+        follow = user_client.get('/follow/')
+        assert follow.content.decode().count('Пост номер') == 10
@@ -0,0 +1,56 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client
+
+from posts import generations
+from posts.models import Comment, Post
+
+CARD = 'includes/post_item.html'
+
+
+def rendered_cards(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, f'Страница `{url}` работает неправильно'
+    return [t.name for t in response.templates].count(CARD), response.content.decode()
+
+
+class TestPostCards:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_only_changed_cards_are_rendered(self, user, user_client):
+        posts = [Post.objects.create(text=f'Карточка {i}', author=user) for i in range(3)]
+        cache.clear()
+        assert rendered_cards(user_client, '/')[0] == 3
+
+        # страница собирается заново, но карточки берутся из кэша
+        generations.bump('posts')
+        assert rendered_cards(user_client, '/')[0] == 0, \
+            'Проверьте, что неизменённые карточки постов не рендерятся повторно'
+
+        Comment.objects.create(text='Комментарий', author=user, post=posts[0])
+        count, content = rendered_cards(user_client, '/')
+        assert count == 1, 'Проверьте, что новый комментарий обновляет только карточку его поста'
+        assert '1 комментариев' in content
+
+        posts[1].text = 'Отредактированная карточка'
+        posts[1].save()
+        count, content = rendered_cards(user_client, '/')
+        assert count == 1 and 'Отредактированная карточка' in content, \
+            'Проверьте, что редактирование поста обновляет его карточку'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_edit_link_only_for_author(self, user, user_client):
+        post = Post.objects.create(text='Пост автора', author=user)
+        edit_url = f'/{user.username}/{post.pk}/edit/'
+        cache.clear()
+        assert edit_url in rendered_cards(user_client, '/')[1]
+
+        other = get_user_model().objects.create_user(username='Reader')
+        reader = Client()
+        reader.force_login(other)
+        for client in (reader, Client()):
+            content = rendered_cards(client, '/')[1]
+            assert edit_url not in content, \
+                'Проверьте, что ссылка на редактирование видна только автору поста'
+        assert edit_url in rendered_cards(user_client, f'/{user.username}/')[1]
@@ -0,0 +1,69 @@
+import pytest
+from django.db.models.query import QuerySet
+from django.test import Client
+
+from posts.instrumentation import assert_within_budget
+from posts.models import Comment, Post
+from posts.paginator import COMMENTS_PER_PAGE
+
+
+@pytest.fixture
+def discussed(user):
+    post = Post.objects.create(text='Обсуждаемый пост', author=user)
+    Comment.objects.bulk_create([
+        Comment(text=f'Комментарий {i}', author=user, post=post)
+        for i in range(COMMENTS_PER_PAGE + 5)
+    ])
+    return post
+
+
+def get(client, url, **params):
+    response = client.get(url, params)
+    assert response.status_code == 200, f'Страница `{url}` работает неправильно'
+    assert_within_budget(response)
+    return response
+
+
+class TestCommentsPage:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_first_page_is_capped(self, client, discussed):
+        url = f'/{discussed.author.username}/{discussed.pk}/'
+        response = get(client, url)
+        items = response.context['items']
+        assert len(items) == COMMENTS_PER_PAGE, \
+            'Проверьте, что на странице поста показывается только первая страница комментариев'
+        assert isinstance(response.context['comments'], QuerySet)
+        assert items.has_next and items.next_cursor
+        assert f'{url}comments/?after={items.next_cursor}' in response.content.decode(), \
+            'Проверьте, что на странице поста есть кнопка загрузки следующих комментариев'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_load_more_fragment(self, client, discussed):
+        url = f'/{discussed.author.username}/{discussed.pk}/'
+        first = get(client, url).context['items']
+        response = get(Client(), url + 'comments/', after=first.next_cursor)
+        content = response.content.decode()
+        assert '<html' not in content, 'Проверьте, что следующие комментарии отдаются фрагментом'
+        assert [c.id for c in response.context['items']] == \
+            list(discussed.comments.order_by('-created', '-id').values_list('id', flat=True))[COMMENTS_PER_PAGE:]
+        assert 'Показать ещё' not in content
+
+        # без JS ссылка ведёт на ту же страницу поста
+        page = get(client, url, after=first.next_cursor).context['items']
+        assert len(page) == 5
+
+    @pytest.mark.django_db(transaction=True)
+    def test_load_more_json(self, client, discussed):
+        url = f'/{discussed.author.username}/{discussed.pk}/comments/'
+        data = get(client, url, format='json').json()
+        assert len(data['comments']) == COMMENTS_PER_PAGE
+        assert data['next'] and data['previous'] is None
+        rest = get(client, data['next']).json()
+        assert len(rest['comments']) == 5 and rest['next'] is None
+        assert rest['comments'][-1]['text'] == 'Комментарий 0'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_load_more_checks_author(self, client, discussed):
+        assert client.get(f'/other/{discussed.pk}/comments/').status_code == 404
+        assert client.get(f'/{discussed.author.username}/{discussed.pk + 1}/comments/').status_code == 404
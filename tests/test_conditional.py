@@ -0,0 +1,98 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.http import http_date
+
+from posts import conditional
+from posts.models import Comment, Follow, Post
+
+
+@pytest.fixture
+def author_post(user, group):
+    cache.clear()
+    return Post.objects.create(text='Пост для проверки ETag', author=user, group=group)
+
+
+def read_urls(post):
+    return (
+        '/',
+        f'/group/{post.group.slug}/',
+        f'/{post.author.username}/',
+        f'/{post.author.username}/{post.id}/',
+    )
+
+
+class TestConditionalGet:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_unchanged_pages_answer_304(self, client, user_client, author_post, monkeypatch):
+        # секунда последнего изменения уже прошла
+        monkeypatch.setattr(conditional, 'time', SimpleNamespace(time=lambda: time.time() + 1))
+        for test_client in (client, user_client):
+            for url in read_urls(author_post):
+                response = test_client.get(url)
+                assert response.status_code == 200
+                assert response.has_header('ETag') and response.has_header('Last-Modified'), \
+                    f'Проверьте, что страница `{url}` отдаёт ETag и Last-Modified'
+
+                by_etag = test_client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                assert by_etag.status_code == 304, \
+                    f'Проверьте, что `{url}` отвечает 304 на совпавший If-None-Match'
+                assert by_etag.context is None, 'При ответе 304 шаблон не должен рендериться'
+
+                by_date = test_client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                assert by_date.status_code == 304, \
+                    f'Проверьте, что `{url}` отвечает 304 на If-Modified-Since'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_no_last_modified_within_the_changing_second(self, client, author_post,
+                                                          monkeypatch):
+        url = f'/{author_post.author.username}/{author_post.id}/'
+        second = int(time.time())
+        changed = second + 0.25
+        monkeypatch.setattr(conditional.generations, 'get_state',
+                            lambda *scopes: ([scopes, changed], changed))
+        monkeypatch.setattr(conditional, 'time', SimpleNamespace(time=lambda: second + 0.75))
+        fresh = client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(changed))
+        assert fresh.status_code == 200 and not fresh.has_header('Last-Modified'), \
+            'Проверьте, что дата изменения не отдаётся, пока её секунда не закончилась'
+
+        monkeypatch.setattr(conditional, 'time', SimpleNamespace(time=lambda: second + 1))
+        response = client.get(url)
+        assert response['Last-Modified'] == http_date(second)
+        assert client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code == 304
+
+    @pytest.mark.django_db(transaction=True)
+    def test_changes_invalidate_validators(self, user, user_client, author_post):
+        etags = {url: user_client.get(url)['ETag'] for url in read_urls(author_post)}
+        Comment.objects.create(text='Новый комментарий', author=user, post=author_post)
+        for url, etag in etags.items():
+            response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200, \
+                f'Проверьте, что после нового комментария `{url}` отдаётся заново'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_changes_profile_validator(self, user_client, author_post):
+        author = get_user_model().objects.create_user(username='EtagAuthor')
+        url = f'/{author.username}/'
+        etag = user_client.get(url)['ETag']
+        Follow.objects.create(user=author_post.author, author=author)
+        assert user_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200, \
+            'Проверьте, что после подписки страница профиля отдаётся заново'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_anonymous_responses_are_cached(self, client, author_post):
+        url = f'/{author_post.author.username}/{author_post.id}/'
+        client.get(url)
+        # bypasses signals, so the cached response must still be served
+        Post.objects.filter(pk=author_post.pk).update(text='Изменён в обход сигналов')
+        response = client.get(url)
+        assert response.status_code == 200
+        assert 'Пост для проверки ETag' in response.content.decode(), \
+            'Проверьте, что ответы для анонимных пользователей кэшируются целиком'
+
+        Post.objects.get(pk=author_post.pk).save()
+        assert 'Изменён в обход сигналов' in client.get(url).content.decode()
@@ -0,0 +1,74 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Post, UserStats
+
+
+class TestCounters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_counters_follow_write_paths(self, user, user_client):
+        author = get_user_model().objects.create_user(username='CounterAuthor')
+        user_client.post('/new/', {'text': 'Пост со счётчиком'})
+        post = Post.objects.get(author=user)
+        user_client.post(f'/{user.username}/{post.id}/comment/', {'text': 'Комментарий'})
+        user_client.get(f'/{author.username}/follow/')
+
+        post.refresh_from_db()
+        assert post.comments_count == 1
+        stats = UserStats.objects.get(user=user)
+        assert (stats.posts_count, stats.followers_count, stats.following_count) == (1, 0, 1)
+        assert UserStats.objects.get(user=author).followers_count == 1
+
+        user_client.get(f'/{author.username}/unfollow/')
+        Comment.objects.get(post=post).delete()
+        post.delete()
+        stats.refresh_from_db()
+        assert (stats.posts_count, stats.following_count) == (0, 0)
+        assert UserStats.objects.get(user=author).followers_count == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_profile_renders_without_aggregates(self, client, user):
+        Post.objects.create(text='Пост', author=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/{user.username}/')
+        assert response.context['posts_count'] == 1
+        assert not [query for query in queries if 'COUNT(' in query['sql']], \
+            'Проверьте, что страница профиля не считает записи и подписки запросами COUNT'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reconcile_counters_repairs_drift(self, user):
+        author = get_user_model().objects.create_user(username='CounterAuthor')
+        Follow.objects.create(user=user, author=author)
+        post = Post.objects.create(text='Пост', author=author)
+        Comment.objects.create(text='Комментарий', author=user, post=post)
+        UserStats.objects.filter(user=author).update(posts_count=7, followers_count=0)
+        UserStats.objects.filter(user=user).delete()
+        Post.objects.filter(pk=post.pk).update(comments_count=5)
+
+        call_command('reconcile_counters')
+
+        author_stats = UserStats.objects.get(user=author)
+        assert (author_stats.posts_count, author_stats.followers_count) == (1, 1)
+        assert UserStats.objects.get(user=user).following_count == 1
+        assert Post.objects.get(pk=post.pk).comments_count == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_drifted_counters_stay_at_zero(self, user):
+        author = get_user_model().objects.create_user(username='CounterAuthor')
+        follow = Follow.objects.create(user=user, author=author)
+        post = Post.objects.create(text='Пост', author=author)
+        comment = Comment.objects.create(text='Комментарий', author=user, post=post)
+        UserStats.objects.filter(user=author).update(posts_count=0, followers_count=0)
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+
+        comment.delete()
+        follow.delete()
+        post.delete()
+        author_stats = UserStats.objects.get(user=author)
+        assert (author_stats.posts_count, author_stats.followers_count) == (0, 0), \
+            'Проверьте, что счётчик, ушедший в ноль, не становится отрицательным'
+        assert UserStats.objects.get(user=user).following_count == 0
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+
+from posts import follow_graph, follows
+from posts.instrumentation import assert_within_budget
+from posts.models import Follow, Post, TimelineEntry, UserStats
+
+
+@pytest.fixture
+def authors():
+    User = get_user_model()
+    authors = [User.objects.create_user(username=f'author{i}') for i in range(5)]
+    for author in authors:
+        Post.objects.create(text=f'Пост {author.username}', author=author)
+    return authors
+
+
+def bulk(client, **data):
+    return client.post('/follow/bulk/', json.dumps(data), content_type='application/json')
+
+
+def stats(user):
+    return UserStats.objects.get(user=user)
+
+
+class TestFollowBulk:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_and_unfollow_lists(self, user, user_client, authors,
+                                       django_assert_max_num_queries):
+        Follow.objects.create(user=user, author=authors[0])
+        usernames = [a.username for a in authors[:4]] + ['nobody', user.username]
+        with django_assert_max_num_queries(13):
+            response = bulk(user_client, follow=usernames)
+        assert response.status_code == 200
+        statuses = {item['username']: item['status'] for item in response.json()['follow']}
+        assert statuses == {
+            'author0': 'already_following', 'author1': 'followed',
+            'author2': 'followed', 'author3': 'followed',
+            'nobody': 'not_found', user.username: 'self',
+        }, 'Проверьте результаты по каждому имени'
+        assert stats(user).following_count == 4
+        assert stats(authors[1]).followers_count == 1
+        assert TimelineEntry.objects.filter(user=user).count() == 4, \
+            'Проверьте, что посты новых авторов попадают в ленту подписок'
+        assert follow_graph.is_following(user, authors[3])
+
+        response = bulk(user_client, unfollow=['author0', 'author1', 'author4'])
+        statuses = [item['status'] for item in response.json()['unfollow']]
+        assert statuses == ['unfollowed', 'unfollowed', 'not_following']
+        assert set(Follow.objects.filter(user=user).values_list('author__username', flat=True)) \
+            == {'author2', 'author3'}
+        assert stats(user).following_count == 2
+        assert stats(authors[0]).followers_count == 0
+        assert TimelineEntry.objects.filter(user=user).count() == 2
+        assert not follow_graph.is_following(user, authors[0])
+
+    @pytest.mark.django_db(transaction=True)
+    def test_both_lists_within_budget(self, user, user_client, authors):
+        Follow.objects.create(user=user, author=authors[0])
+        Follow.objects.create(user=user, author=authors[1])
+        response = bulk(user_client, follow=['author2', 'author3'],
+                        unfollow=['author0', 'author1'])
+        assert response.status_code == 200
+        assert_within_budget(response)
+        assert stats(user).following_count == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_counters_exact_on_races(self, user, authors, monkeypatch):
+        prepare = follows._prepare
+
+        def racing(user, usernames, following):
+            # другой запрос успевает подписаться или отписаться сам
+            prepared = prepare(user, usernames, following)
+            if following:
+                Follow.objects.create(user=user, author=authors[1])
+            else:
+                Follow.objects.filter(user=user, author=authors[2]).delete()
+            return prepared
+
+        monkeypatch.setattr(follows, '_prepare', racing)
+        results = follows.follow_many(user, ['author1', 'author2', 'author3'])
+        assert [item['status'] for item in results] == \
+            ['already_following', 'followed', 'followed']
+        assert stats(user).following_count == 3 and stats(authors[1]).followers_count == 1, \
+            'Проверьте, что подписки, сделанные параллельно, не считаются дважды'
+
+        results = follows.unfollow_many(user, ['author1', 'author2', 'author3'])
+        assert [item['status'] for item in results] == \
+            ['unfollowed', 'not_following', 'unfollowed']
+        assert stats(user).following_count == 0 and stats(authors[2]).followers_count == 0
+        assert not TimelineEntry.objects.filter(user=user).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bad_requests(self, user_client):
+        assert bulk(user_client, follow='author0').status_code == 400
+        assert user_client.post('/follow/bulk/', 'nope',
+                                content_type='application/json').status_code == 400
+        assert user_client.get('/follow/bulk/').status_code == 405
+        response = bulk(Client(), follow=['author0'])
+        assert response.status_code == 302, \
+            'Проверьте, что массовая подписка доступна только авторизованным'
@@ -0,0 +1,52 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+from posts import follow_graph
+from posts.models import Follow
+
+
+@pytest.fixture
+def authors():
+    User = get_user_model()
+    return [User.objects.create_user(username=f'author{i}') for i in range(3)]
+
+
+class TestFollowGraph:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_views_update_cached_set(self, user, user_client, authors,
+                                            django_assert_num_queries):
+        cache.clear()
+        Follow.objects.create(user=user, author=authors[0])
+        assert follow_graph.following_any(user, authors) == {authors[0].pk}
+        with django_assert_num_queries(0):
+            assert follow_graph.is_following(user, authors[0])
+            assert follow_graph.following_any(user, authors) == {authors[0].pk}
+
+        user_client.get(f'/{authors[2].username}/follow/')
+        user_client.get(f'/{authors[0].username}/unfollow/')
+        with django_assert_num_queries(0):
+            assert follow_graph.following_any(user, authors) == {authors[2].pk}, \
+                'Проверьте, что подписка и отписка обновляют множество в кеше'
+        assert not follow_graph.is_following(AnonymousUser(), authors[2])
+
+    @pytest.mark.django_db(transaction=True)
+    def test_profile_button(self, user, user_client, authors):
+        url = f'/{authors[1].username}/'
+        assert 'Подписаться' in user_client.get(url).content.decode()
+        user_client.get(f'/{authors[1].username}/follow/')
+        assert 'Отписаться' in user_client.get(url).content.decode(), \
+            'Проверьте, что после подписки на странице автора кнопка "Отписаться"'
+
+    def test_process_local_cache_expires_soon(self, tmp_path):
+        assert follow_graph._timeout() == follow_graph.LOCAL_TIMEOUT, \
+            'Проверьте, что в LocMemCache других процессов множество быстро устаревает'
+        shared = {'default': {
+            'BACKEND': 'posts.sqlite_cache.SQLiteCache',
+            'LOCATION': str(tmp_path / 'cache.sqlite3'),
+        }}
+        with override_settings(CACHES=shared):
+            assert follow_graph._timeout() == follow_graph.TIMEOUT
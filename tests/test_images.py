@@ -0,0 +1,83 @@
+from io import BytesIO, StringIO
+
+import pytest
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from posts.models import ImageJob, Post
+
+ORIENTATION = 0x0112
+
+
+def rotated_jpeg(name):
+    # 60x30 pixels that a viewer shows rotated by 90 degrees
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    file_obj = BytesIO()
+    Image.new('RGB', size=(60, 30), color=(0, 0, 255)).save(file_obj, 'jpeg', exif=exif)
+    return SimpleUploadedFile(name, file_obj.getvalue(), content_type='image/jpeg')
+
+
+class TestImageQueue:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_upload_is_processed_by_worker(self, user_client, user):
+        response = user_client.post(
+            '/new/', data={'text': 'Пост с картинкой', 'image': rotated_jpeg('queued.jpg')})
+        assert response.status_code == 302
+
+        post = Post.objects.get(text='Пост с картинкой')
+        assert post.image_pending, 'Проверьте, что загруженная картинка ждёт обработки'
+        assert ImageJob.objects.filter(post=post, status=ImageJob.PENDING).exists(), \
+            'Проверьте, что для картинки создаётся задача в очереди'
+        assert 'image_processing.svg' in user_client.get('/').content.decode(), \
+            'Проверьте, что до обработки вместо картинки показывается заглушка'
+
+        out = StringIO()
+        call_command('process_images', processes=1, once=True, stdout=out)
+        assert 'Processed 1 images (0 failed)' in out.getvalue()
+
+        post.refresh_from_db()
+        assert not post.image_pending
+        assert ImageJob.objects.get(post=post).status == ImageJob.DONE
+        with post.image.open('rb') as f:
+            image = Image.open(f)
+            assert image.size == (30, 60), 'Проверьте, что картинка повёрнута по EXIF'
+            assert ORIENTATION not in image.getexif(), 'Проверьте, что EXIF удаляется'
+        assert 'image_processing.svg' not in user_client.get('/').content.decode(), \
+            'Проверьте, что после обработки показывается сама картинка'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_broken_image_fails_without_placeholder(self, user, monkeypatch):
+        from posts import images
+
+        post = Post.objects.create(
+            text='Пост', author=user, image='posts/missing.jpg', image_pending=True)
+        images.enqueue(post)
+        monkeypatch.setattr(images, 'MAX_ATTEMPTS', 1)
+        call_command('process_images', processes=1, once=True, stdout=StringIO())
+
+        job = ImageJob.objects.get(post=post)
+        assert job.status == ImageJob.FAILED and job.error
+        post.refresh_from_db()
+        assert not post.image_pending, \
+            'Проверьте, что пост с необработанной картинкой не остаётся с заглушкой'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_job_of_replaced_image_is_skipped(self, user_client, user):
+        user_client.post('/new/', data={'text': 'Пост', 'image': rotated_jpeg('first.jpg')})
+        post = Post.objects.get(text='Пост')
+        user_client.post(f'/{user.username}/{post.pk}/edit/',
+                         data={'text': 'Пост', 'image': rotated_jpeg('second.jpg')})
+        first, second = ImageJob.objects.filter(post=post).order_by('pk')
+        assert first.image.startswith('posts/first') and second.image.startswith('posts/second')
+
+        call_command('process_images', processes=1, once=True, stdout=StringIO())
+        post.refresh_from_db()
+        assert post.image.name.startswith('posts/second'), \
+            'Проверьте, что устаревшая задача не трогает новую картинку'
+        assert not post.image_pending
+        assert set(ImageJob.objects.values_list('status', flat=True)) == {ImageJob.DONE}
+        with post.image.open('rb') as f:
+            assert Image.open(f).size == (30, 60)
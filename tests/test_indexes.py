@@ -0,0 +1,22 @@
+import pytest
+
+from posts.management.commands.explain_feeds import feed_queries
+
+EXPECTED_INDEXES = {
+    'index': 'post_pub_date_id_idx',
+    'group_posts': 'post_group_pub_date_idx',
+    'profile': 'post_author_pub_date_idx',
+    'follow_index': 'timeline_user_pub_date_idx',
+    'post_view': 'comment_post_created_idx',
+}
+
+
+class TestFeedIndexes:
+
+    @pytest.mark.django_db
+    def test_feed_queries_use_indexes(self):
+        for name, queryset in feed_queries():
+            plan = queryset.explain()
+            index = EXPECTED_INDEXES[name.split()[0]]
+            assert index in plan, f'Запрос `{name}` не использует индекс `{index}`:\n{plan}'
+            assert 'TEMP B-TREE' not in plan, f'Запрос `{name}` сортирует без индекса:\n{plan}'
@@ -0,0 +1,108 @@
+import contextlib
+import importlib
+import logging
+
+import pytest
+
+from posts import views
+from posts.instrumentation import assert_within_budget
+from posts.models import Post
+from tests.fixtures.fixture_data import image_file
+from yatube import settings as base_settings
+
+
+@contextlib.contextmanager
+def request_log(caplog):
+    """caplog with the posts.requests records; used inside the test body,
+    caplog replaces its handler for every phase of the test"""
+    # posts.requests does not propagate to the root logger caplog listens on
+    logger = logging.getLogger('posts.requests')
+    propagate, logger.propagate = logger.propagate, True
+    try:
+        with caplog.at_level(logging.INFO, logger='posts.requests'):
+            yield caplog
+    finally:
+        logger.propagate = propagate
+
+
+class TestInstrumentation:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_server_timing_and_log_line(self, user_client, feed, caplog):
+        with request_log(caplog):
+            response = user_client.get('/')
+        header = response.get('Server-Timing', '')
+        for metric in ('sql;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            assert metric in header, f'Проверьте, что заголовок Server-Timing содержит `{metric}`'
+
+        lines = [r for r in caplog.records if r.name == 'posts.requests']
+        assert len(lines) == 1, 'Проверьте, что на каждый запрос пишется одна строка лога'
+        assert 'url_name=index' in lines[0].getMessage()
+        assert lines[0].timing['sql_queries'] == response.wsgi_request.timing.queries
+
+    def test_request_log_level(self, monkeypatch):
+        def level():
+            return importlib.reload(base_settings).LOGGING['loggers']['posts.requests']['level']
+        try:
+            monkeypatch.delenv('REQUEST_LOG_LEVEL', raising=False)
+            assert level() == 'INFO', \
+                'Проверьте, что строка о каждом запросе пишется в лог без настройки'
+            monkeypatch.setenv('REQUEST_LOG_LEVEL', 'WARNING')
+            assert level() == 'WARNING'
+        finally:
+            monkeypatch.undo()
+            importlib.reload(base_settings)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_views_stay_within_query_budget(self, user_client, user, feed, group):
+        own = Post.objects.create(text='Свой пост', author=user)
+        post = Post.objects.filter(author=feed).first()
+        requests = (
+            ('get', '/'),
+            ('get', f'/group/{group.slug}/'),
+            ('get', f'/{feed.username}/'),
+            ('get', '/follow/'),
+            ('post', f'/{feed.username}/{post.pk}/comment/'),
+            ('get', f'/{feed.username}/unfollow/'),
+            ('get', f'/{feed.username}/follow/'),
+            ('get', f'/{user.username}/{own.pk}/edit/'),
+        )
+        for method, url in requests:
+            response = getattr(user_client, method)(url, {'text': 'Комментарий'})
+            assert response.status_code in (200, 302), f'Страница `{url}` работает неправильно'
+            assert_within_budget(response)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_posts_stay_within_query_budget(self, user_client, user, feed, group):
+        own = Post.objects.create(text='Свой пост', author=user)
+        post = Post.objects.filter(author=feed).first()
+        requests = (
+            ('/new/', {'text': 'Новый пост', 'group': group.pk}),
+            ('/new/', {'text': 'Пост с картинкой', 'group': group.pk,
+                       'image': image_file('new.png')}),
+            (f'/{user.username}/{own.pk}/edit/', {'text': 'Правка'}),
+            (f'/{user.username}/{own.pk}/edit/', {'text': 'Правка', 'group': group.pk,
+                                                  'image': image_file('edit.png')}),
+            (f'/{user.username}/{own.pk}/edit/', {'text': 'Правка', 'image-clear': 'on'}),
+            (f'/{feed.username}/{post.pk}/comment/', {'text': 'Комментарий'}),
+            (f'/{feed.username}/unfollow/', {}),
+            (f'/{feed.username}/follow/', {}),
+            (f'/{feed.username}/unfollow/', {}),
+        )
+        for url, data in requests:
+            response = user_client.post(url, data)
+            assert response.status_code == 302, f'Страница `{url}` работает неправильно'
+            assert_within_budget(response)
+        response = user_client.get(f'/{user.username}/archive/')
+        assert response.status_code == 200
+        assert_within_budget(response)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_over_budget_fails(self, user_client, feed, monkeypatch, caplog):
+        monkeypatch.setattr(views.index, 'query_budget', 1)
+        with request_log(caplog):
+            response = user_client.get('/')
+        with pytest.raises(AssertionError):
+            assert_within_budget(response)
+        assert any('its budget is 1' in r.getMessage() for r in caplog.records), \
+            'Проверьте, что превышение бюджета запросов попадает в лог'
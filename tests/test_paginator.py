@@ -1,6 +1,6 @@
 import pytest
 
-from django.core.paginator import Paginator, Page
+from posts.paginator import CursorPaginator, CursorPage
 
 
 class TestGroupPaginatorView:
@@ -17,12 +17,12 @@ class TestGroupPaginatorView:
 
         assert 'paginator' in response.context, \
             'Проверьте, что передали переменную `paginator` в контекст страницы `/group/<slug>/`'
-        assert type(response.context['paginator']) == Paginator, \
-            'Проверьте, что переменная `paginator` на странице `/group/<slug>/` типа `Paginator`'
+        assert type(response.context['paginator']) == CursorPaginator, \
+            'Проверьте, что переменная `paginator` на странице `/group/<slug>/` типа `CursorPaginator`'
         assert 'page' in response.context, \
             'Проверьте, что передали переменную `page` в контекст страницы `/group/<slug>/`'
-        assert type(response.context['page']) == Page, \
-            'Проверьте, что переменная `page` на странице `/group/<slug>/` типа `Page`'
+        assert type(response.context['page']) == CursorPage, \
+            'Проверьте, что переменная `page` на странице `/group/<slug>/` типа `CursorPage`'
 
     @pytest.mark.django_db(transaction=True)
     def test_index_paginator_view_get(self, client, post_with_group):
@@ -30,9 +30,57 @@ class TestGroupPaginatorView:
         assert response.status_code != 404, 'Страница `/` не найдена, проверьте этот адрес в *urls.py*'
         assert 'paginator' in response.context, \
             'Проверьте, что передали переменную `paginator` в контекст страницы `/`'
-        assert type(response.context['paginator']) == Paginator, \
-            'Проверьте, что переменная `paginator` на странице `/` типа `Paginator`'
+        assert type(response.context['paginator']) == CursorPaginator, \
+            'Проверьте, что переменная `paginator` на странице `/` типа `CursorPaginator`'
         assert 'page' in response.context, \
             'Проверьте, что передали переменную `page` в контекст страницы `/`'
-        assert type(response.context['page']) == Page, \
-            'Проверьте, что переменная `page` на странице `/` типа `Page`'
+        assert type(response.context['page']) == CursorPage, \
+            'Проверьте, что переменная `page` на странице `/` типа `CursorPage`'
+
+
+class TestCursorPaginatorView:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cursor_pages_walk_the_feed(self, client, user, group):
+        from posts.models import Post
+        for i in range(25):
+            Post.objects.create(text=f'Тестовый пост {i}', author=user, group=group)
+        expected = list(Post.objects.order_by('-pub_date', '-id').values_list('id', flat=True))
+        url = f'/group/{group.slug}/'
+
+        first = client.get(url).context['page']
+        assert [post.id for post in first] == expected[:10], \
+            'Проверьте, что первая страница содержит 10 самых новых записей'
+        assert not first.has_previous() and first.has_next()
+
+        second = client.get(url, {'after': first.next_cursor}).context['page']
+        assert [post.id for post in second] == expected[10:20], \
+            'Проверьте, что `?after=` возвращает следующие записи'
+
+        third = client.get(url, {'after': second.next_cursor}).context['page']
+        assert [post.id for post in third] == expected[20:]
+        assert not third.has_next()
+
+        back = client.get(url, {'before': third.previous_cursor}).context['page']
+        assert [post.id for post in back] == expected[10:20], \
+            'Проверьте, что `?before=` возвращает предыдущие записи'
+
+        broken = client.get(url, {'after': 'not-a-cursor'}).context['page']
+        assert [post.id for post in broken] == expected[:10]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_legacy_page_number_redirects_to_cursor(self, client, user, group):
+        from posts.models import Post
+        for i in range(25):
+            Post.objects.create(text=f'Тестовый пост {i}', author=user, group=group)
+        expected = list(Post.objects.order_by('-pub_date', '-id').values_list('id', flat=True))
+        url = f'/group/{group.slug}/'
+
+        response = client.get(url, {'page': 3})
+        assert response.status_code == 302, 'Проверьте, что `?page=N` переадресует на курсор'
+        assert '?after=' in response.url
+        page = client.get(response.url).context['page']
+        assert [post.id for post in page] == expected[20:]
+
+        response = client.get(url, {'page': 1})
+        assert response.status_code == 302 and response.url == url
@@ -0,0 +1,50 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Post
+from posts.text import PREVIEW_LENGTH
+
+
+class TestPostText:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rendered_on_save(self, user_client, user):
+        post = Post.objects.create(text='<b>Первая</b>\nвторая строка', author=user)
+        assert post.text_html == '&lt;b&gt;Первая&lt;/b&gt;<br>вторая строка', \
+            'Проверьте, что текст поста экранируется и переводы строк заменяются на <br>'
+        assert post.preview == '<b>Первая</b> вторая строка'
+
+        user_client.post(f'/{user.username}/{post.pk}/edit/', {'text': 'Новый\nтекст ' + 'а' * 300})
+        post.refresh_from_db()
+        assert post.text_html.startswith('Новый<br>текст'), \
+            'Проверьте, что при редактировании HTML поста пересчитывается'
+        assert len(post.preview) == PREVIEW_LENGTH
+
+        response = user_client.get(f'/{user.username}/{post.pk}/')
+        assert 'Новый<br>текст' in response.content.decode()
+        assert f'content="{post.preview}"' in response.content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feeds_do_not_load_raw_text(self, client, user):
+        Post.objects.create(text='Пост', author=user)
+        with CaptureQueriesContext(connection) as queries:
+            assert client.get('/').status_code == 200
+        feed = [q['sql'] for q in queries if 'FROM "posts_post"' in q['sql']]
+        assert feed and all('"posts_post"."text",' not in sql for sql in feed), \
+            'Проверьте, что ленты не читают исходный текст постов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_backfill_command(self, user):
+        Post.objects.bulk_create([Post(text=f'Старый\nпост {i}', author=user) for i in range(3)])
+        out = StringIO()
+        call_command('render_post_text', batch_size=2, stdout=out)
+        assert 'Rendered 3 posts' in out.getvalue()
+        assert set(Post.objects.values_list('text_html', flat=True)) == \
+            {f'Старый<br>пост {i}' for i in range(3)}
+        call_command('render_post_text', stdout=out)
+        assert 'Rendered 0 posts' in out.getvalue(), \
+            'Проверьте, что уже отрендеренные посты пропускаются'
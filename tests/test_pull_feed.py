@@ -0,0 +1,97 @@
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from posts import pull_feed
+from posts.models import Follow, Post, TimelineEntry
+
+
+@pytest.fixture
+def followed(user):
+    User = get_user_model()
+    authors = [User.objects.create_user(username=f'writer{i}') for i in range(3)]
+    for number in range(25):
+        Post.objects.create(text=f'Пост номер {number}', author=authors[number % 3])
+    for author in authors[:2]:
+        Follow.objects.create(user=user, author=author)
+    return authors
+
+
+def feed_pages(client):
+    """texts of the posts on every page of the follow feed, following
+    the "next" links"""
+    pages, url = [], '/follow/'
+    while url:
+        response = client.get(url)
+        pages.append([post.text for post in response.context['page']])
+        page = response.context['page']
+        url = '/follow/?after=%s' % page.next_cursor if page.has_next() else None
+    return pages
+
+
+class TestPullFeed:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_same_pages_as_timeline(self, user_client, followed, settings):
+        timeline_pages = feed_pages(user_client)
+        settings.FOLLOW_FEED_ENGINE = 'pull'
+        cache.clear()
+        assert feed_pages(user_client) == timeline_pages, \
+            'Проверьте, что лента из слияния совпадает с timeline'
+        assert [len(page) for page in timeline_pages] == [10, 7]
+
+        response = user_client.get('/follow/?page=2')
+        assert response.status_code == 302
+        response = user_client.get(response.url)
+        assert [post.text for post in response.context['page']] == timeline_pages[1]
+        before = response.context['page'].previous_cursor
+        response = user_client.get(f'/follow/?before={before}')
+        assert [post.text for post in response.context['page']] == timeline_pages[0]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_heads_follow_new_and_deleted_posts(self, user, user_client, followed,
+                                                settings, django_assert_num_queries):
+        settings.FOLLOW_FEED_ENGINE = 'pull'
+        cache.clear()
+        author_ids = [author.pk for author in followed]
+        pull_feed.heads(author_ids)
+        with django_assert_num_queries(0):
+            heads = pull_feed.heads(author_ids)
+        assert [len(list(pull_feed.pairs(heads[pk]))) for pk in author_ids] == [9, 8, 8]
+
+        post = Post.objects.create(text='Самый новый пост', author=followed[1])
+        head = pull_feed.heads([followed[1].pk])[followed[1].pk]
+        assert next(pull_feed.pairs(head)) == (pull_feed.micros(post.pub_date), post.pk), \
+            'Проверьте, что новый пост попадает в начало кеша автора'
+        # новый пост не копируется в timeline подписчиков
+        assert not user.timeline.filter(post=post).exists()
+        content = user_client.get('/follow/').content.decode()
+        assert 'Самый новый пост' in content
+
+        post.delete()
+        head = pull_feed.heads([followed[1].pk])[followed[1].pk]
+        assert post.pk not in [pk for _, pk in pull_feed.pairs(head)]
+        assert 'Самый новый пост' not in user_client.get('/follow/').content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pull_engine_keeps_no_timelines(self, user, user_client, settings):
+        settings.FOLLOW_FEED_ENGINE = 'pull'
+        User = get_user_model()
+        authors = [User.objects.create_user(username=f'puller{i}') for i in range(3)]
+        for author in authors:
+            Post.objects.create(text=f'Пост {author.username}', author=author)
+
+        user_client.get(f'/{authors[0].username}/follow/')
+        user_client.post('/follow/bulk/', json.dumps({'follow': ['puller1', 'puller2']}),
+                         content_type='application/json')
+        Post.objects.create(text='Новый пост', author=authors[1])
+        assert not TimelineEntry.objects.exists(), \
+            'Проверьте, что при pull-ленте подписки и посты не пишут в timeline'
+        assert len(feed_pages(user_client)[0]) == 4
+
+        user_client.get(f'/{authors[0].username}/unfollow/')
+        user_client.post('/follow/bulk/', json.dumps({'unfollow': ['puller1']}),
+                         content_type='application/json')
+        assert feed_pages(user_client) == [['Пост puller2']]
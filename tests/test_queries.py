@@ -0,0 +1,22 @@
+import pytest
+
+
+class TestFeedQueries:
+    # a page of 10 cards must cost a fixed number of queries, not one per card
+    BUDGET = 10
+
+    def check_budget(self, client, url, django_assert_max_num_queries, budget=BUDGET):
+        with django_assert_max_num_queries(budget):
+            response = client.get(url)
+        assert response.status_code == 200, f'Страница `{url}` работает неправильно'
+        return response
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feeds_stay_under_query_budget(self, user_client, feed, group,
+                                           django_assert_max_num_queries):
+        for url in ('/', f'/group/{group.slug}/', f'/{feed.username}/', '/follow/'):
+            response = self.check_budget(user_client, url, django_assert_max_num_queries)
+            assert len(response.context['page']) == 10
+            if 'group' not in url:
+                assert '3 комментариев' in response.content.decode(), \
+                    f'Проверьте, что на странице `{url}` выводится число комментариев'
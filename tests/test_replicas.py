@@ -0,0 +1,71 @@
+import time
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from posts import replicas
+from posts.models import Post
+
+
+@pytest.fixture
+def replica(tmp_path, settings):
+    connections.databases['replica'] = dict(
+        connections['default'].settings_dict, NAME=str(tmp_path / 'replica.sqlite3'))
+    settings.DATABASE_REPLICAS = ['replica']
+    cache.clear()
+    yield 'replica'
+    connections['replica'].close()
+    del connections.databases['replica']
+    del connections._connections.replica
+
+
+def read(client, url, alias='replica'):
+    with CaptureQueriesContext(connections[alias]) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response.content.decode(), len(queries)
+
+
+class TestReplicas:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feeds_read_fresh_replica(self, replica, user, user_client):
+        Post.objects.create(text='Пост до копии', author=user)
+        call_command('refresh_replica', stdout=StringIO())
+        content, replica_queries = read(Client(), '/')
+        assert replica_queries == 0, \
+            'Проверьте, что копия, сделанная сразу после изменения, не используется'
+
+        # копия позже последнего изменения ленты автора
+        read(user_client, f'/{user.username}/', 'default')
+        cache.set('replica-synced:replica', time.time() + replicas.FRESHNESS_MARGIN)
+        content, replica_queries = read(Client(), f'/{user.username}/')
+        assert replica_queries > 0, 'Проверьте, что ленты читаются из реплики'
+        assert 'Пост до копии' in content
+
+        # новое изменение позже копии: снова основная база
+        Post.objects.create(text='Пост после копии', author=user)
+        content, replica_queries = read(Client(), f'/{user.username}/')
+        assert replica_queries == 0 and 'Пост после копии' in content, \
+            'Проверьте, что отстающая реплика не используется'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_writer_sticks_to_primary(self, replica, user, user_client):
+        call_command('refresh_replica', stdout=StringIO())
+        response = user_client.post('/new/', {'text': 'Мой новый пост'})
+        assert response.status_code == 302
+        assert replicas.PIN_COOKIE in response.cookies, \
+            'Проверьте, что после записи пользователь закрепляется за основной базой'
+
+        # копия считается свежей, хотя нового поста в ней нет
+        cache.set('replica-synced:replica', time.time() + 60)
+        content, replica_queries = read(user_client, '/')
+        assert replica_queries == 0 and 'Мой новый пост' in content, \
+            'Проверьте, что автор сразу видит свой пост'
+        content, replica_queries = read(Client(), '/')
+        assert replica_queries > 0 and 'Мой новый пост' not in content
@@ -0,0 +1,68 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from posts import search
+from posts.instrumentation import assert_within_budget
+from posts.models import Post
+
+
+def found(client, query):
+    response = client.get('/search/', {'q': query})
+    assert response.status_code == 200, 'Страница `/search/` работает неправильно'
+    assert_within_budget(response)
+    return [post.text for post in response.context['page']]
+
+
+class TestSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_follows_create_edit_delete(self, client, user):
+        post = Post.objects.create(text='Рыжий кот спит на окне', author=user)
+        Post.objects.bulk_create([Post(text='Собака и кот во дворе', author=user)])
+        Post.objects.create(text='Просто собака', author=user)
+
+        assert set(found(client, 'кот')) == {'Рыжий кот спит на окне', 'Собака и кот во дворе'}, \
+            'Проверьте, что поиск находит посты по слову'
+        assert found(client, 'рыж') == ['Рыжий кот спит на окне'], \
+            'Проверьте, что поиск находит слова по началу'
+        assert found(client, 'кот собака') == ['Собака и кот во дворе'], \
+            'Проверьте, что в результатах есть все слова запроса'
+        assert found(client, '"') == [] and found(client, '') == []
+
+        post.text = 'Рыжий пёс спит на окне'
+        post.save()
+        assert 'Рыжий пёс спит на окне' not in found(client, 'кот'), \
+            'Проверьте, что индекс обновляется при редактировании поста'
+        assert found(client, 'пёс') == ['Рыжий пёс спит на окне']
+
+        Post.objects.filter(text__startswith='Собака').delete()
+        assert found(client, 'кот') == [], 'Проверьте, что удалённые посты пропадают из поиска'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_ranked_by_relevance_then_date(self, client, user):
+        Post.objects.create(text='кот', author=user)
+        Post.objects.create(text='кот кот кот', author=user)
+        Post.objects.create(text='кот и много других слов в длинном тексте', author=user)
+        texts = found(client, 'кот')
+        assert texts[0] == 'кот кот кот', 'Проверьте, что выдача отсортирована по релевантности'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_admin_search_uses_index(self, client, user):
+        Post.objects.create(text='Рыжий кот', author=user)
+        Post.objects.create(text='Собака', author=user)
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        client.force_login(admin)
+        response = client.get('/admin/posts/post/', {'q': 'кот'})
+        assert response.status_code == 200
+        assert [post.text for post in response.context['cl'].result_list] == ['Рыжий кот']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_dropped_triggers_are_restored(self, client, user):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_post_fts_insert')
+        Post.objects.create(text='Пост без индекса', author=user)
+        assert found(client, 'индекса') == []
+        assert search.ensure_index(), 'Проверьте, что триггеры создаются заново'
+        assert found(client, 'индекса') == ['Пост без индекса'], \
+            'Проверьте, что индекс перестраивается после восстановления триггеров'
@@ -0,0 +1,67 @@
+import multiprocessing
+
+import pytest
+
+from posts.sqlite_cache import SQLiteCache
+
+
+def make_cache(tmp_path, **options):
+    return SQLiteCache(str(tmp_path / 'cache.sqlite3'), {'OPTIONS': options})
+
+
+def bump(args):
+    location, times = args
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('generation')
+    return times
+
+
+class TestSQLiteCache:
+
+    def test_basic_operations(self, tmp_path):
+        cache = make_cache(tmp_path)
+        cache.set('key', {'value': 1})
+        assert cache.get('key') == {'value': 1}
+        assert cache.get('missing', 'default') == 'default'
+        cache.set_many({'a': 1, 'b': 2})
+        assert cache.get_many(['a', 'b', 'c']) == {'a': 1, 'b': 2}
+        assert cache.add('a', 10) is False and cache.add('c', 3) is True
+        assert cache.incr('a', 5) == 6 and cache.decr('a') == 5
+        with pytest.raises(ValueError):
+            cache.incr('missing')
+        cache.delete_many(['a', 'b'])
+        assert not cache.has_key('a') and cache.has_key('c')
+        cache.clear()
+        assert cache.get('c') is None
+
+    def test_expiry(self, tmp_path):
+        cache = make_cache(tmp_path)
+        cache.set('gone', 1, timeout=-1)
+        cache.set('forever', 1, timeout=None)
+        assert cache.get('gone') is None and cache.get('forever') == 1
+        assert cache.add('gone', 2) is True, 'Проверьте, что add() заменяет истёкшие записи'
+        assert cache.touch('forever', 100) is True
+
+    def test_lru_eviction(self, tmp_path):
+        cache = make_cache(tmp_path, MAX_ENTRIES=10, CULL_FREQUENCY=5, CULL_EVERY=1)
+        cache.set('hot', 'value')
+        for i in range(30):
+            cache.set('key:%s' % i, i)
+            cache._connection().execute(
+                "UPDATE cache SET accessed = 0 WHERE key LIKE '%hot'")
+            # прочитанный ключ — самый свежий
+            cache.get('hot')
+        count = cache._connection().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        assert count <= 10, 'Проверьте, что размер кэша ограничен MAX_ENTRIES'
+        assert cache.get('hot') == 'value', 'Проверьте, что вытесняются давно не читанные записи'
+        assert cache.get('key:0') is None
+
+    def test_shared_between_processes(self, tmp_path):
+        cache = make_cache(tmp_path)
+        cache.set('generation', 0)
+        location = str(tmp_path / 'cache.sqlite3')
+        with multiprocessing.get_context('fork').Pool(4) as pool:
+            pool.map(bump, [(location, 50)] * 4)
+        assert cache.get('generation') == 200, \
+            'Проверьте, что incr() атомарен между процессами'
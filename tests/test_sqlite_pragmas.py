@@ -0,0 +1,66 @@
+import importlib
+import sqlite3
+import sys
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts.sqlite_backend.base import DatabaseWrapper
+from yatube import settings
+
+
+def open_database(path):
+    wrapper = DatabaseWrapper(dict(connection.settings_dict, NAME=str(path)), alias='pragmas')
+    wrapper.ensure_connection()
+    return wrapper
+
+
+class TestProductionDatabase:
+
+    def test_profile(self, production):
+        database = production.DATABASES['default']
+        assert database['CONN_MAX_AGE'] > 0, 'Проверьте, что соединения переиспользуются'
+        assert database['ENGINE'] == 'posts.sqlite_backend'
+        assert production.DEBUG is False
+        assert settings.DATABASES['default'].get('CONN_MAX_AGE', 0) == 0 and \
+            settings.DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3', \
+            'Проверьте, что профиль не меняет настройки разработки'
+
+    def test_secret_key_required(self, production, monkeypatch):
+        assert production.SECRET_KEY == 'test-secret-key'
+        monkeypatch.delenv('SECRET_KEY')
+        monkeypatch.delitem(sys.modules, 'yatube.settings_production')
+        with pytest.raises(ImproperlyConfigured):
+            importlib.import_module('yatube.settings_production')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pragmas_on_new_connections(self, production, tmp_path):
+        with override_settings(SQLITE_PRAGMAS=production.SQLITE_PRAGMAS):
+            wrapper = open_database(tmp_path / 'db.sqlite3')
+        try:
+            with wrapper.cursor() as cursor:
+                def pragma(name):
+                    cursor.execute('PRAGMA %s' % name)
+                    return cursor.fetchone()[0]
+                assert pragma('journal_mode') == 'wal'
+                assert pragma('synchronous') == 1
+                assert pragma('busy_timeout') == production.SQLITE_PRAGMAS['busy_timeout']
+                assert pragma('mmap_size') == production.SQLITE_PRAGMAS['mmap_size']
+                assert pragma('cache_size') == production.SQLITE_PRAGMAS['cache_size']
+        finally:
+            wrapper.close()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_transactions_take_the_write_lock(self, tmp_path):
+        path = tmp_path / 'db.sqlite3'
+        wrapper = open_database(path)
+        try:
+            wrapper._start_transaction_under_autocommit()
+            other = sqlite3.connect(str(path), timeout=0)
+            with pytest.raises(sqlite3.OperationalError, match='locked'):
+                other.execute('BEGIN IMMEDIATE')
+            other.close()
+        finally:
+            wrapper.close()
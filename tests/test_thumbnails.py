@@ -0,0 +1,36 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from posts import thumbnails
+from posts.models import Post
+from tests.fixtures.fixture_data import image_file
+
+
+class TestThumbnails:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_thumbnail_is_created_on_save(self, user, monkeypatch):
+        created = []
+        monkeypatch.setattr(thumbnails, 'pregenerate', created.append)
+        Post.objects.create(text='Пост без картинки', author=user)
+        post = Post.objects.create(text='Пост с картинкой', author=user, image=image_file('thumb.png'))
+        assert created == [post.image.name], \
+            'Проверьте, что миниатюра создаётся при сохранении поста с картинкой'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_warm_thumbnails_command(self, user, tmp_path):
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=user, image=image_file(f'warm{i}.png'))
+        Post.objects.create(text='Без картинки', author=user)
+        checkpoint = tmp_path / 'checkpoint'
+        out = StringIO()
+
+        call_command('warm_thumbnails', processes=1, checkpoint=str(checkpoint), stdout=out)
+        assert 'Warmed 3 thumbnails (0 failed)' in out.getvalue()
+        last = Post.objects.exclude(image='').order_by('-pk').first()
+        assert checkpoint.read_text() == str(last.pk), \
+            'Проверьте, что команда сохраняет прогресс для --resume'
+
+        call_command('warm_thumbnails', processes=1, checkpoint=str(checkpoint), resume=True)
@@ -0,0 +1,71 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+
+class TestTimeline:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_timeline_follows_posts_and_subscriptions(self, user, user_client):
+        author = get_user_model().objects.create_user(username='TimelineAuthor')
+        old_post = Post.objects.create(text='Старый пост', author=author)
+
+        user_client.get(f'/{author.username}/follow/')
+        assert list(TimelineEntry.objects.filter(user=user).values_list('post_id', flat=True)) \
+            == [old_post.id], 'Проверьте, что при подписке лента дополняется постами автора'
+
+        new_post = Post.objects.create(text='Новый пост', author=author)
+        response = user_client.get('/follow/')
+        assert [post.id for post in response.context['page']] == [new_post.id, old_post.id], \
+            'Проверьте, что новый пост попадает в ленту подписчика'
+
+        user_client.get(f'/{author.username}/unfollow/')
+        assert not TimelineEntry.objects.filter(user=user).exists(), \
+            'Проверьте, что при отписке посты автора убираются из ленты'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_timeline_length_is_bounded(self, user, monkeypatch):
+        monkeypatch.setattr(timeline, 'TIMELINE_LENGTH', 3)
+        author = get_user_model().objects.create_user(username='TimelineAuthor')
+        other = get_user_model().objects.create_user(username='OtherReader')
+        Follow.objects.create(user=user, author=author)
+        Follow.objects.create(user=other, author=author)
+        posts = [Post.objects.create(text=f'Пост {i}', author=author) for i in range(5)]
+        assert TimelineEntry.objects.filter(user=user).count() == 5, \
+            'Проверьте, что новый пост не обрезает ленты подписчиков'
+
+        call_command('trim_timelines')
+        for reader in (user, other):
+            kept = TimelineEntry.objects.filter(user=reader).order_by('-pub_date')
+            assert [entry.post_id for entry in kept] == [post.id for post in posts[:1:-1]]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_new_post_queries_do_not_grow_with_followers(self):
+        User = get_user_model()
+        author = User.objects.create_user(username='TimelineAuthor')
+
+        def queries_of_new_post(followers):
+            for i in range(followers):
+                reader = User.objects.create_user(username=f'reader{followers}_{i}')
+                Follow.objects.create(user=reader, author=author)
+            with CaptureQueriesContext(connection) as queries:
+                Post.objects.create(text='Пост', author=author)
+            return len(queries)
+
+        assert queries_of_new_post(3) == queries_of_new_post(30), \
+            'Проверьте, что публикация не делает запросов на каждого подписчика'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_timelines_command(self, user):
+        author = get_user_model().objects.create_user(username='TimelineAuthor')
+        Follow.objects.create(user=user, author=author)
+        post = Post.objects.create(text='Пост', author=author)
+        TimelineEntry.objects.all().delete()
+
+        call_command('rebuild_timelines')
+        assert list(TimelineEntry.objects.values_list('user_id', 'post_id')) == [(user.id, post.id)]
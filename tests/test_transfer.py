@@ -0,0 +1,102 @@
+import json
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+
+from posts import search
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+
+@pytest.fixture
+def site(user, group):
+    author = get_user_model().objects.create_user(username='Exported')
+    Follow.objects.create(user=user, author=author)
+    for i in range(5):
+        post = Post.objects.create(text=f'Импортируемый пост {i}', author=author, group=group)
+        Comment.objects.create(text=f'Комментарий {i}', author=user, post=post)
+    return author
+
+
+def export(tmp_path):
+    path = tmp_path / 'dump.jsonl'
+    out = StringIO()
+    call_command('export_yatube', str(path), chunk_size=2, stdout=out)
+    assert 'rows/s' in out.getvalue(), 'Проверьте, что экспорт сообщает скорость'
+    return path
+
+
+class TestTransfer:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_writes_jsonl(self, site, tmp_path):
+        lines = export(tmp_path).read_text(encoding='utf-8').splitlines()
+        rows = [json.loads(line) for line in lines]
+        assert rows[0]['type'] == 'header'
+        types = [row['type'] for row in rows[1:]]
+        assert types == sorted(types, key=['user', 'group', 'post', 'comment', 'follow'].index), \
+            'Проверьте, что строки выгружаются в порядке зависимостей'
+        assert types.count('post') == 5 and types.count('comment') == 5
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_into_empty_database(self, site, user, tmp_path):
+        path = export(tmp_path)
+        dates = list(Post.objects.order_by('pk').values_list('pub_date', flat=True))
+        Post.objects.all().delete()
+        Comment.objects.all().delete()
+        Follow.objects.all().delete()
+        Group.objects.all().delete()
+        get_user_model().objects.all().delete()
+
+        out = StringIO()
+        call_command('import_yatube', str(path), batch_size=2, stdout=out)
+        assert 'rows/s' in out.getvalue(), 'Проверьте, что импорт сообщает скорость'
+
+        author = get_user_model().objects.get(username='Exported')
+        reader = get_user_model().objects.get(username=user.username)
+        posts = Post.objects.filter(author=author).order_by('pk')
+        assert list(posts.values_list('pub_date', flat=True)) == dates, \
+            'Проверьте, что даты публикации сохраняются при импорте'
+        assert all(post.group.slug == 'test-link' for post in posts)
+        assert Comment.objects.filter(post__author=author, author=reader).count() == 5, \
+            'Проверьте, что ссылки комментариев пересчитываются на новые id'
+        assert author.stats.posts_count == 5 and author.stats.followers_count == 1, \
+            'Проверьте, что счётчики пересчитываются после импорта'
+        assert TimelineEntry.objects.filter(user=reader).count() == 5, \
+            'Проверьте, что ленты подписок пересобираются после импорта'
+        assert search.search_posts(Post.objects.all(), 'импортируемый').count() == 5, \
+            'Проверьте, что поисковый индекс пересобирается после импорта'
+        last_pk = posts.last().pk
+        assert Post.objects.create(text='Новый', author=author).pk > last_pk, \
+            'Проверьте, что автоинкремент продолжается после импортированных id'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_next_to_existing_data(self, site, tmp_path):
+        path = export(tmp_path)
+        call_command('import_yatube', str(path), stdout=StringIO())
+
+        assert get_user_model().objects.filter(username='Exported').count() == 1, \
+            'Проверьте, что существующие пользователи переиспользуются'
+        assert Group.objects.count() == 1
+        assert Post.objects.filter(author=site).count() == 10
+        assert Follow.objects.count() == 1
+        for post in Post.objects.all():
+            assert post.comments.count() == 1 and post.comments_count == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_failed_import_leaves_nothing(self, site, tmp_path):
+        path = export(tmp_path)
+        lines = path.read_text(encoding='utf-8').splitlines()
+        posts = Post.objects.count()
+        for bad in ('{"text": "без типа"}', '[1, 2]', '{"type": "post", "text": "мало полей"}'):
+            broken = tmp_path / 'broken.jsonl'
+            broken.write_text('\n'.join(lines[:-3] + [bad] + lines[-3:]), encoding='utf-8')
+            with pytest.raises(CommandError):
+                call_command('import_yatube', str(broken), batch_size=2, stdout=StringIO())
+            assert Post.objects.count() == posts, \
+                'Проверьте, что прерванный импорт не оставляет строк в базе'
+
+        call_command('import_yatube', str(path), batch_size=2, stdout=StringIO())
+        assert Post.objects.count() == posts * 2
+        assert search.search_posts(Post.objects.all(), 'импортируемый').count() == posts * 2
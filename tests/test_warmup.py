@@ -0,0 +1,55 @@
+import logging
+import os
+
+import pytest
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import Client
+
+from posts import warmup
+from posts.models import Group, Post
+
+
+class TestWarmStart:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_templates_compiled_and_feeds_primed(self, user, group, settings,
+                                                 django_assert_num_queries):
+        empty = Group.objects.create(title='Пустая', slug='empty')
+        Post.objects.create(text='Пост в группе', author=user, group=group)
+        settings.WARM_START_GROUPS = 1
+        report = warmup.warm_start(WSGIHandler(), modules=set())
+
+        templates = sum(len(files) for _, _, files in os.walk(settings.TEMPLATES_DIR))
+        assert report['templates'] == templates and report['failed'] == [], \
+            'Проверьте, что компилируются все шаблоны из templates/'
+        assert report['pages'] == {'/': 200, f'/group/{group.slug}/': 200}, \
+            'Проверьте, что заранее открываются главная и самые большие группы'
+        assert f'/group/{empty.slug}/' not in report['pages']
+        assert report['modules'] > 0 and report['steps']['pages'] > 0
+
+        with django_assert_num_queries(0):
+            response = Client().get('/')
+        assert 'Пост в группе' in response.content.decode(), \
+            'Проверьте, что главная после прогрева отдаётся из кеша'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_failure_leaves_process_cold(self, monkeypatch, caplog):
+        def broken(application, urls):
+            raise RuntimeError('no such table: posts_post')
+        monkeypatch.setattr(warmup, 'prime', broken)
+        # posts.startup does not propagate to the root logger caplog listens on
+        monkeypatch.setattr(logging.getLogger('posts.startup'), 'handlers', [caplog.handler])
+        assert warmup.warm_start(WSGIHandler()) is None
+        assert 'warm start failed' in caplog.text, \
+            'Проверьте, что ошибка прогрева пишется в лог и не мешает запуску'
+        assert Client().get('/').status_code == 200
+
+    def test_cached_loader_in_production(self, settings, production):
+        template_settings = production.TEMPLATES[0]
+        assert production.WARM_START and not template_settings['APP_DIRS']
+        assert template_settings['OPTIONS']['loaders'][0][0] == \
+            'django.template.loaders.cached.Loader', \
+            'Проверьте, что в продакшене шаблоны компилируются один раз'
+        assert settings.TEMPLATES[0]['APP_DIRS'] and \
+            'loaders' not in settings.TEMPLATES[0]['OPTIONS'], \
+            'Проверьте, что профиль не меняет настройки разработки'
@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.core import checks
+from django.db import DatabaseError
+
+from .forms import RESERVED_USERNAMES
+
+
+# запускается из migrate и из check --tag database: нужна база
+@checks.register(checks.Tags.database)
+def reserved_usernames(app_configs=None, **kwargs):
+    """аккаунты, заведённые до RESERVED_USERNAMES: их профиль или
+    страницы постов перекрыты адресами сайта"""
+    try:
+        usernames = sorted(
+            get_user_model().objects.filter(username__in=RESERVED_USERNAMES)
+            .values_list('username', flat=True))
+    except DatabaseError:
+        # таблиц ещё нет, migrate их создаст
+        return []
+    return [
+        checks.Warning(
+            'Страницы пользователя "%s" под /%s/ заняты адресами сайта' % (
+                username, username),
+            hint='Переименуйте пользователя в админке',
+            obj=username,
+            id='users.W001',
+        )
+        for username in usernames
+    ]
@@ -1,9 +1,17 @@
+from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import get_user_model
 
 
 User = get_user_model()
 
+# первые сегменты адресов сайта: профиль с таким именем перекрыл бы
+# их страницы (/search/, /follow/) или они — его (/api/follow/)
+RESERVED_USERNAMES = frozenset({
+    "about", "about-us", "admin", "api", "auth", "follow", "group",
+    "media", "new", "posts", "search", "static", "terms",
+})
+
 
 #  создадим собственный класс для формы регистрации
 #  сделаем его наследником предустановленного класса UserCreationForm
@@ -13,3 +21,9 @@ class CreationForm(UserCreationForm):
         model = User
         # укажем, какие поля должны быть видны в форме и в каком порядке
         fields = ("first_name", "last_name", "username", "email")
+
+    def clean_username(self):
+        username = self.cleaned_data["username"]
+        if username.lower() in RESERVED_USERNAMES:
+            raise forms.ValidationError("Это имя пользователя занято")
+        return username
@@ -53,6 +53,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # первым, чтобы учитывать запросы сессий и аутентификации
+    'posts.instrumentation.ServerTimingMiddleware',
+    'posts.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,6 +85,21 @@ TEMPLATES = [
     },
 ]
 
+# быстрый старт (posts.warmup): yatube/wsgi.py компилирует шаблоны и
+# заранее отрисовывает главную и самые большие группы; шаблоны разбираются
+# один раз на процесс даже при DEBUG, правки видны после перезапуска
+WARM_START = os.environ.get('YATUBE_WARM_START') == '1'
+WARM_START_GROUPS = 5
+CACHED_TEMPLATE_LOADERS = [(
+    'django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ],
+)]
+if WARM_START:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = CACHED_TEMPLATE_LOADERS
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -95,6 +113,27 @@ DATABASES = {
     }
 }
 
+# копии базы только для чтения для лент (posts.replicas), например
+# YATUBE_REPLICAS=/var/tmp/replica1.sqlite3; их обновляет команда refresh_replica
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.environ.get('YATUBE_REPLICAS', '').split(',')), 1):
+    DATABASES['replica%s' % number] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append('replica%s' % number)
+DATABASE_ROUTERS = ['posts.replicas.ReplicaRouter']
+# столько секунд после записи пользователь читает только основную базу;
+# больше интервала refresh_replica
+REPLICA_PIN_SECONDS = 15
+
+# лента подписок: 'timeline' копирует каждый новый пост подписчикам,
+# 'pull' сливает последние посты авторов из кеша (posts.pull_feed);
+# перед возвратом к 'timeline' выполнить rebuild_timelines
+FOLLOW_FEED_ENGINE = os.environ.get('YATUBE_FOLLOW_FEED', 'timeline')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -170,3 +209,38 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+# общий для всех процессов на машине кэш (posts.sqlite_cache): укажите
+# путь к файлу, например /var/tmp/yatube-cache.sqlite3; без переменной
+# у каждого процесса свой LocMemCache
+if os.environ.get('YATUBE_CACHE_PATH'):
+    CACHES['default'] = {
+        'BACKEND': 'posts.sqlite_cache.SQLiteCache',
+        'LOCATION': os.environ['YATUBE_CACHE_PATH'],
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('YATUBE_CACHE_MAX_ENTRIES', 100000)),
+        },
+    }
+
+# posts.instrumentation пишет строку на каждый запрос с уровнем INFO,
+# превышение бюджета запросов к БД — с уровнем WARNING;
+# REQUEST_LOG_LEVEL=WARNING оставляет в логе только превышения
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'posts.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        # отчёт posts.warmup о старте процесса
+        'posts.startup': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,73 @@
+"""
+Production profile: DJANGO_SETTINGS_MODULE=yatube.settings_production
+
+Everything from settings.py, plus an SQLite tuned for several gunicorn
+workers writing at once, the cache shared between them and a warm start
+of every worker.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import (
+    BASE_DIR, CACHED_TEMPLATE_LOADERS, DATABASE_REPLICAS, DATABASES, TEMPLATES,
+)
+
+DEBUG = False
+
+# ключ из settings.py лежит в репозитории, в продакшене он не годится
+SECRET_KEY = os.environ.get('SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('Set the SECRET_KEY environment variable')
+ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+
+# быстрый старт (posts.warmup), выключается YATUBE_WARM_START=0
+WARM_START = os.environ.get('YATUBE_WARM_START', '1') == '1'
+if WARM_START:
+    TEMPLATES = [dict(
+        TEMPLATES[0],
+        APP_DIRS=False,
+        OPTIONS=dict(TEMPLATES[0]['OPTIONS'], loaders=CACHED_TEMPLATE_LOADERS),
+    )]
+
+DATABASES = dict(
+    DATABASES,
+    default=dict(
+        DATABASES['default'],
+        # BEGIN IMMEDIATE в transaction.atomic, см. posts/sqlite_backend
+        ENGINE='posts.sqlite_backend',
+        # одно соединение на поток на 10 минут вместо нового на каждый запрос
+        CONN_MAX_AGE=600,
+        # секунды ожидания блокировки на запись в sqlite3.connect()
+        OPTIONS={'timeout': 20},
+    ),
+)
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = dict(DATABASES[alias], CONN_MAX_AGE=600)
+
+# выполняются для каждого нового соединения (posts.sqlite_pragmas)
+SQLITE_PRAGMAS = {
+    'busy_timeout': 20000,
+    # читатели не ждут писателя, писатель не ждёт читателей
+    'journal_mode': 'WAL',
+    # в WAL fsync только на checkpoint; при сбое питания теряется
+    # последняя транзакция, но база не портится
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # в КиБ, если число отрицательное
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'posts.sqlite_cache.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_PATH', os.path.join(BASE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('YATUBE_CACHE_MAX_ENTRIES', 100000)),
+        },
+    }
+}
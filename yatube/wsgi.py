@@ -8,9 +8,20 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 """
 
 import os
+import sys
+import time
 
-from django.core.wsgi import get_wsgi_application
+# for the startup report of posts.warmup
+_started = time.perf_counter()
+_modules = set(sys.modules)
+
+from django.conf import settings  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.WARM_START:
+    from posts.warmup import warm_start
+    warm_start(application, _started, _modules)